@@ -0,0 +1,156 @@
+from pathlib import Path
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List
+from rich.console import Console
+from rich.panel import Panel
+
+# Add parent directory to Python path so we can import extractors
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from extractors import cache, lineage
+from extractors.registry import EXTRACTOR_CLASSES
+from extractors.telemetry import get_telemetry, percentile
+from extractors.extraction_utils import extract_and_format_data_async
+
+console = Console()
+
+def collect_files(inputs: List[str]) -> List[Path]:
+    """Expand directories and glob patterns into a sorted list of .md files."""
+    files = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.update(path.glob('*.md'))
+        else:
+            files.update(Path(match) for match in glob.glob(item, recursive=True))
+    return sorted(f for f in files if f.suffix == '.md')
+
+def load_checkpoint(checkpoint_path: Path) -> Dict[str, dict]:
+    """Return the last checkpoint record of every file processed so far."""
+    records = {}
+    if checkpoint_path.exists():
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record['file']] = record
+    return records
+
+def append_checkpoint(checkpoint_path: Path, record: dict) -> None:
+    """Durably append one record to the checkpoint file."""
+    with open(checkpoint_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def write_json(output_file: Path, mongo_doc: dict) -> None:
+    """Write a document atomically, so an interrupted run never leaves half a file."""
+    tmp_file = output_file.with_suffix('.json.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(mongo_doc, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, output_file)
+
+async def process_file(file_path: Path, output_dir: Path, checkpoint_path: Path,
+                       semaphore: asyncio.Semaphore, results: List[dict],
+                       incremental: bool = False, redo: Iterable[str] = ()) -> None:
+    """Extract one patient file under the concurrency limit and checkpoint the outcome."""
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            mongo_doc = await extract_and_format_data_async(file_path, project_root, show_progress=False,
+                                                            incremental=incremental, redo=redo)
+            if mongo_doc:
+                write_json(output_dir / f"{file_path.stem}.json", mongo_doc)
+            status = "ok" if mongo_doc else "failed"
+        except Exception as e:
+            console.print(f"[red]Error processing {file_path.name}: {str(e)}[/red]")
+            status = "failed"
+
+        record = {"file": str(file_path), "status": status, "seconds": round(time.perf_counter() - start, 3)}
+        append_checkpoint(checkpoint_path, record)
+        results.append(record)
+        colour = "green" if status == "ok" else "red"
+        console.print(f"[{colour}]{status}[/{colour}] {file_path.name} ({record['seconds']:.1f}s)")
+
+async def run_batch(files: List[Path], output_dir: Path, checkpoint_path: Path,
+                    concurrency: int, results: List[dict],
+                    incremental: bool = False, redo: Iterable[str] = ()) -> None:
+    """Process files with at most `concurrency` patients in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    await asyncio.gather(*(process_file(f, output_dir, checkpoint_path, semaphore, results, incremental, redo)
+                           for f in files))
+
+def print_summary(results: List[dict], skipped: int, wall_time: float) -> None:
+    """Print throughput, failures, latency percentiles and per-model call telemetry of this run."""
+    latencies = [r["seconds"] for r in results if r["status"] == "ok"]
+    failed = sum(1 for r in results if r["status"] != "ok")
+    lines = [
+        f"Processed: {len(results)} ({skipped} already done)",
+        f"Succeeded: {len(latencies)}",
+        f"Failed: {failed}",
+        f"Wall time: {wall_time:.1f}s",
+    ]
+    if wall_time > 0:
+        lines.append(f"Throughput: {len(results) / wall_time * 60:.1f} patients/min")
+    if latencies:
+        lines.append(f"Latency p50: {percentile(latencies, 50):.1f}s, p95: {percentile(latencies, 95):.1f}s")
+    lines.extend(get_telemetry().summary_lines())
+    console.print(Panel("\n".join(lines), title="Batch Extraction Summary", border_style="blue"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract many patient files into MongoDB JSON documents")
+    parser.add_argument("inputs", nargs="*", default=[str(project_root / "data" / "md-final")],
+                        help="directories or glob patterns of cleaned patient .md files")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="number of patients extracted at the same time")
+    parser.add_argument("--output-dir", type=Path, default=project_root / "data" / "json")
+    parser.add_argument("--checkpoint", type=Path, default=None,
+                        help="progress file (default: <output-dir>/.batch-checkpoint.jsonl)")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="ignore cached extraction results and store fresh ones")
+    parser.add_argument("--incremental", action="store_true",
+                        help="re-extract only the (patient, extractor) pairs whose lineage changed "
+                             "(note, instructions, model or schema) instead of using the checkpoint")
+    parser.add_argument("--redo", nargs="+", default=[], choices=sorted(EXTRACTOR_CLASSES),
+                        help="with --incremental, extractors to re-run regardless of lineage")
+    args = parser.parse_args()
+    cache.set_bypass(args.refresh_cache)
+
+    output_dir = args.output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = args.checkpoint or output_dir / ".batch-checkpoint.jsonl"
+
+    files = collect_files(args.inputs)
+    if args.incremental:
+        plans = lineage.plan(files, project_root, args.redo)
+        console.print("\n".join(lineage.summary_lines(plans, len(files))))
+        # Documents missing from output_dir are rebuilt from the stored results
+        pending = [f for f in files if f in plans or not (output_dir / f"{f.stem}.json").exists()]
+    else:
+        done = {name for name, record in load_checkpoint(checkpoint_path).items() if record["status"] == "ok"}
+        pending = [f for f in files if str(f) not in done]
+    skipped = len(files) - len(pending)
+
+    console.print(Panel(f"{len(pending)} files to process, {skipped} already done, "
+                        f"concurrency {args.concurrency}",
+                        title="Batch Extraction Pipeline", border_style="blue"))
+
+    results: List[dict] = []
+    start = time.perf_counter()
+    try:
+        asyncio.run(run_batch(pending, output_dir, checkpoint_path, args.concurrency, results,
+                              args.incremental, args.redo))
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Interrupted; completed files are checkpointed, rerun to resume[/yellow]")
+    finally:
+        print_summary(results, skipped, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+# Add parent directory to Python path so we can import extractors
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from extractors.replay import load_recording, request_key
+
+# Local OpenAI-compatible chat completions endpoint for offline runs:
+#   python benchmarks/llm_standin.py --port 8765 --latency lognormal:1.5:0.4
+#   OPENROUTER_BASE_URL=http://127.0.0.1:8765/v1 python batch_extraction.py ...
+# Requests recorded by extractors/replay.py are answered from the recordings;
+# anything else gets a synthetic answer that fills the requested result schema.
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Return a sampler for 'fixed:S', 'uniform:LOW:HIGH' or 'lognormal:MEDIAN:SIGMA' (seconds)."""
+    kind, *params = spec.split(':')
+    values = [float(p) for p in params]
+    if kind == 'fixed' and len(values) == 1:
+        return lambda: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'lognormal' and len(values) == 2:
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+def synthesize(schema: Dict[str, Any], defs: Dict[str, Any], name: str = '') -> Any:
+    """Build a value that validates against a JSON schema, filling every field."""
+    if '$ref' in schema:
+        return synthesize(defs[schema['$ref'].split('/')[-1]], defs, name)
+    if 'anyOf' in schema:
+        options = [option for option in schema['anyOf'] if option.get('type') != 'null']
+        return synthesize(options[0], defs, name) if options else None
+    if 'enum' in schema:
+        return schema['enum'][0]
+    kind = schema.get('type')
+    if kind == 'object':
+        return {key: synthesize(value, defs, key) for key, value in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [synthesize(schema.get('items', {}), defs, name)]
+    if kind == 'string':
+        if 'date' in name:
+            return '01-01-2024'
+        if 'time' in name:
+            return '12:00'
+        return f"synthetic {name}".strip()
+    if kind == 'integer':
+        return 1
+    if kind == 'number':
+        return 1.0
+    if kind == 'boolean':
+        return False
+    return {}
+
+class StandinState:
+    """Configuration and prompt-cache simulation shared by the request handlers."""
+
+    def __init__(self, latency: Callable[[], float], error_rate: float, recordings_dir: Optional[Path]):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.recordings_dir = recordings_dir
+        self.seen_prefixes: set = set()
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def cached_tokens(self, messages: list) -> int:
+        """Simulate provider prefix caching: a system prompt seen before counts as cached."""
+        system = ''.join(str(m.get('content', '')) for m in messages if m.get('role') == 'system')
+        digest = hashlib.sha256(system.encode('utf-8')).hexdigest()
+        with self.lock:
+            self.requests += 1
+            seen = digest in self.seen_prefixes
+            self.seen_prefixes.add(digest)
+        return len(system) // 4 if seen else 0
+
+def completion(request: dict, cached_tokens: int) -> dict:
+    """Return a chat completion calling the request's result tool with synthetic arguments."""
+    tools = request.get('tools') or []
+    tool = next((t for t in tools if t['function']['name'].startswith('final_result')), tools[0] if tools else None)
+    prompt_tokens = sum(len(str(m.get('content', ''))) for m in request.get('messages', [])) // 4
+    message: Dict[str, Any] = {"role": "assistant", "content": None}
+    if tool:
+        parameters = tool['function'].get('parameters', {})
+        arguments = json.dumps(synthesize(parameters, parameters.get('$defs', {})))
+        message["tool_calls"] = [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": tool['function']['name'], "arguments": arguments},
+        }]
+        completion_tokens = len(arguments) // 4
+    else:
+        message["content"] = "synthetic answer"
+        completion_tokens = 3
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get('model', 'standin'),
+        "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool else "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": min(cached_tokens, prompt_tokens)},
+        },
+    }
+
+def make_handler(state: StandinState):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                return self.reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+            request = json.loads(body)
+            time.sleep(state.latency())
+            if random.random() < state.error_rate:
+                return self.reply(429, {"error": {"message": "Simulated rate limit"}}, {"Retry-After": "1"})
+
+            if state.recordings_dir is not None:
+                recording = load_recording(state.recordings_dir, request_key('POST', self.path, body))
+                if recording is not None:
+                    return self.reply(recording["status"], recording["body"])
+            self.reply(200, completion(request, state.cached_tokens(request.get('messages', []))))
+
+        def reply(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def start_server(port: int = 0, latency: str = 'fixed:0', error_rate: float = 0.0,
+                 recordings_dir: Optional[Path] = None) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread; port 0 picks a free port (see server.server_port)."""
+    state = StandinState(parse_latency(latency), error_rate, recordings_dir)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible stand-in for the extraction LLMs")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:1.5:0.4",
+                        help="fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests answered with HTTP 429")
+    parser.add_argument("--recordings", type=Path, default=None,
+                        help="directory of responses recorded with LLM_REPLAY_MODE=record")
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.latency, args.error_rate, args.recordings)
+    print(f"LLM stand-in listening on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
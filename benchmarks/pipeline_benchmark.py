@@ -0,0 +1,132 @@
+from pathlib import Path
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+# Add parent directory to Python path so we can import extractors
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from benchmarks.llm_standin import start_server
+
+# End-to-end benchmark of the extraction orchestration against the local LLM
+# stand-in: per-patient latency of extract_and_format_data and batch
+# throughput at several concurrency levels, without network or token spend.
+
+SYNTHETIC_NOTE = """
+>> unit admission note <<
+Unidade de Queimados
+1965-05-14
+Doente Sintetico {patient_id}
+{process_number}
+Nº Processo:
+Feminino
+Rua das Flores 12, 4000-123 Porto
+Tel: 912345678
+12-03-2023 14:35
+HDA: Queimadura por chama em contexto domestico, ASCQ ~{tbsa}%.
+Antecedentes: HTA, DM tipo 2. Medicacao habitual: metformina.
+>> END unit admission note <<
+
+>> unit discharge note <<
+Alta médica: 30/03/2023 10h05
+Submetida a desbridamento e enxerto em 15-03-2023.
+>> END unit discharge note <<
+"""
+
+def write_synthetic_notes(directory: Path, count: int) -> List[Path]:
+    """Write count synthetic patient notes and return their paths."""
+    files = []
+    for i in range(count):
+        patient_id = 9000 + i
+        path = directory / f"{patient_id}.md"
+        path.write_text(SYNTHETIC_NOTE.format(patient_id=patient_id, process_number=1000000 + i,
+                                              tbsa=5 + i % 40), encoding='utf-8')
+        files.append(path)
+    return files
+
+async def bench_single(files: List[Path], quiet: bool) -> None:
+    """Time extract_and_format_data on each file, one at a time."""
+    from extractors.extraction_utils import extract_and_format_data_async
+    from extractors.telemetry import percentile
+
+    latencies = []
+    for file_path in files:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            doc = await extract_and_format_data_async(file_path, project_root, show_progress=False)
+        latencies.append(time.perf_counter() - start)
+        if doc is None:
+            print(f"  extraction failed for {file_path.name}")
+    print(f"extract_and_format_data: {len(files)} files, mean {sum(latencies) / len(latencies):.3f}s, "
+          f"p50 {percentile(latencies, 50):.3f}s, p95 {percentile(latencies, 95):.3f}s")
+
+async def bench_batch(files: List[Path], concurrency_levels: List[int], quiet: bool) -> None:
+    """Measure batch throughput at each concurrency level."""
+    import batch_extraction
+    from extractors.telemetry import percentile
+
+    for concurrency in concurrency_levels:
+        with tempfile.TemporaryDirectory() as tmp:
+            output_dir = Path(tmp)
+            results: List[dict] = []
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+                await batch_extraction.run_batch(files, output_dir, output_dir / "checkpoint.jsonl",
+                                                 concurrency, results)
+            elapsed = time.perf_counter() - start
+        ok = sum(1 for r in results if r["status"] == "ok")
+        latencies = [r["seconds"] for r in results]
+        print(f"batch concurrency {concurrency:>3}: {ok}/{len(files)} ok in {elapsed:.2f}s, "
+              f"{len(files) / elapsed * 60:.1f} patients/min, p95 {percentile(latencies, 95):.2f}s")
+
+async def run(files: List[Path], concurrency_levels: List[int], quiet: bool) -> None:
+    from extractors.resilience import set_limits
+    from settings import ModelProvider
+
+    # Measure the orchestration, not the production rate limits
+    for provider in ModelProvider:
+        set_limits(provider, rpm=10**6, tpm=10**9)
+
+    await bench_single(files[:min(len(files), 10)], quiet)
+    await bench_batch(files, concurrency_levels, quiet)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extraction pipeline against an offline LLM stand-in")
+    parser.add_argument("inputs", nargs="*", type=Path,
+                        help="patient .md files (default: synthetic notes)")
+    parser.add_argument("--synthetic", type=int, default=40, help="number of synthetic notes")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", default="lognormal:0.5:0.4",
+                        help="stand-in latency: fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of simulated 429s")
+    parser.add_argument("--base-url", default=None, help="use a running stand-in instead of starting one")
+    parser.add_argument("--verbose", action="store_true", help="keep the extractors' output")
+    args = parser.parse_args()
+
+    if args.base_url is None:
+        server = start_server(0, args.latency, args.error_rate)
+        args.base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    print(f"Using LLM stand-in at {args.base_url}")
+
+    # Configure before settings is imported: offline endpoint, no result cache, no telemetry or lineage files
+    os.environ["OPENROUTER_BASE_URL"] = args.base_url
+    os.environ["EXTRACTION_CACHE_ENABLED"] = "0"
+    os.environ["TELEMETRY_ENABLED"] = "0"
+    os.environ["LINEAGE_ENABLED"] = "0"
+    os.environ["LLM_REPLAY_MODE"] = "off"
+    os.environ.setdefault("OPENROUTER_API_KEY", "offline")
+    os.environ.setdefault("GEMINI_API_KEY", "offline")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = args.inputs or write_synthetic_notes(Path(tmp), args.synthetic)
+        asyncio.run(run(files, args.concurrency, not args.verbose))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+from pathlib import Path
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List, Tuple
+from rich.console import Console
+from rich.table import Table
+
+# Add parent directory to Python path so we can import extractors
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from extractors.extraction_utils import create_mongo_document
+from extractors.patient_extractor import extract_patient_id
+from extractors.registry import get_extractor
+
+console = Console()
+
+async def timed_run(extractor, md_content: str) -> Tuple[object, int, int, float]:
+    """Run an extractor's agent directly (no cache) and return (data, input tokens, output tokens, seconds).
+
+    The input is built like the pipeline's, glossary entries included (see BaseExtractor.note_prompt).
+    """
+    start = time.perf_counter()
+    result = await extractor.agent.run(extractor.note_prompt(extractor.select_input(md_content)))
+    usage = result.usage()
+    return result.data, usage.request_tokens or 0, usage.response_tokens or 0, time.perf_counter() - start
+
+async def run_separate(md_content: str, patient_id: int) -> Tuple[dict, int, int, float]:
+    """Three concurrent calls, as in the default pipeline."""
+    start = time.perf_counter()
+    runs = await asyncio.gather(*(
+        timed_run(get_extractor(extractor_type, project_root), md_content)
+        for extractor_type in ("patient", "burn", "medical_history")
+    ))
+    elapsed = time.perf_counter() - start
+    patient_data, burn_data, medical_history = (run[0] for run in runs)
+    patient_data.id_patient = patient_id
+    doc = create_mongo_document(patient_data, burn_data, medical_history)
+    return doc, sum(run[1] for run in runs), sum(run[2] for run in runs), elapsed
+
+async def run_combined(md_content: str, patient_id: int) -> Tuple[dict, int, int, float]:
+    """One call returning CombinedData."""
+    data, input_tokens, output_tokens, elapsed = await timed_run(get_extractor("combined", project_root), md_content)
+    data.patient.id_patient = patient_id
+    doc = create_mongo_document(data.patient, data.burn, data.medical_history)
+    return doc, input_tokens, output_tokens, elapsed
+
+def field_agreement(separate: dict, combined: dict) -> Dict[str, bool]:
+    """Compare two MongoDB documents field by field (medical history per sub-field)."""
+    agreement = {}
+    for key, value in separate.items():
+        if key == "medical_history":
+            for sub_key, sub_value in value.items():
+                agreement[f"medical_history.{sub_key}"] = sub_value == combined[key].get(sub_key)
+        else:
+            agreement[key] = value == combined.get(key)
+    return agreement
+
+async def compare(files: List[Path]) -> None:
+    """Run both modes on every file and print tokens, latency and field agreement."""
+    totals = {"separate": [0, 0, 0.0], "combined": [0, 0, 0.0]}
+    matches: Dict[str, int] = {}
+    compared = 0
+
+    for file_path in files:
+        console.print(f"[cyan]Comparing modes on {file_path.name}[/cyan]")
+        md_content = file_path.read_text(encoding='utf-8')
+        patient_id = extract_patient_id(file_path.name)
+        try:
+            separate = await run_separate(md_content, patient_id)
+            combined = await run_combined(md_content, patient_id)
+        except Exception as e:
+            console.print(f"[red]Skipping {file_path.name}: {e}[/red]")
+            continue
+
+        for mode, (_, input_tokens, output_tokens, elapsed) in (("separate", separate), ("combined", combined)):
+            totals[mode][0] += input_tokens
+            totals[mode][1] += output_tokens
+            totals[mode][2] += elapsed
+        for field, same in field_agreement(separate[0], combined[0]).items():
+            matches[field] = matches.get(field, 0) + same
+        compared += 1
+
+    if not compared:
+        console.print("[red]No files compared[/red]")
+        return
+
+    table = Table(title=f"Extraction modes over {compared} file(s)")
+    table.add_column("Mode")
+    table.add_column("Input tokens", justify="right")
+    table.add_column("Output tokens", justify="right")
+    table.add_column("Mean latency (s)", justify="right")
+    for mode, (input_tokens, output_tokens, elapsed) in totals.items():
+        table.add_row(mode, str(input_tokens), str(output_tokens), f"{elapsed / compared:.2f}")
+    console.print(table)
+
+    agreement = Table(title="Field agreement (combined vs separate)")
+    agreement.add_column("Field")
+    agreement.add_column("Agree", justify="right")
+    for field, count in matches.items():
+        style = "" if count == compared else "yellow"
+        agreement.add_row(field, f"{count}/{compared}", style=style)
+    console.print(agreement)
+    overall = sum(matches.values()) / (len(matches) * compared)
+    console.print(f"Overall agreement: {overall:.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the three-call and combined single-call extraction modes")
+    parser.add_argument("files", nargs="+", type=Path, help="markdown notes to extract")
+    args = parser.parse_args()
+
+    asyncio.run(compare(args.files))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import sys
+import argparse
+import hashlib
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Set, Tuple
+
+# Add project root to Python path so we can import the data package
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from data.manifest import hash_text
+
+DEFAULT_INDEX_PATH = Path(__file__).parent / "boilerplate-index.json"
+
+# Lines never learned or stripped as boilerplate: section markers and the
+# labels the extraction instructions and pre-extraction rules use to locate
+# fields (matched case-insensitively, as line hashes are)
+KEEP_PATTERNS = [
+    r'^>> .* <<$',
+    r'Processo',
+    r'Masculino|Feminino',
+    r'Alta',
+    r'\bTel\b',
+    r'Antecedentes|Medica[çc][ãa]o|Alergias|Cir[úu]rgic',
+    r'ASCQ|ASC\b|HDA',
+]
+
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+def normalize_line(line: str) -> str:
+    """Collapse whitespace and case so template lines compare equal."""
+    return ' '.join(line.split()).casefold()
+
+def compile_keep_patterns(patterns: List[str]) -> re.Pattern:
+    """Combine keep patterns into one case-insensitive regex."""
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+
+def line_hash(line: str) -> str:
+    """Return a short stable hash of the normalized line."""
+    return hashlib.blake2b(normalize_line(line).encode('utf-8'), digest_size=8).hexdigest()
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count: words and punctuation marks."""
+    return len(TOKEN_PATTERN.findall(text))
+
+class BoilerplateIndex:
+    """Hashes of lines repeated across a large fraction of patients."""
+
+    def __init__(self, hashes: Set[str], patients: int, threshold: float,
+                 keep_patterns: List[str] = KEEP_PATTERNS):
+        self.hashes = hashes
+        self.patients = patients
+        self.threshold = threshold
+        self.keep = compile_keep_patterns(keep_patterns)
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the learned set and keep patterns, so outputs can be invalidated when they change."""
+        return hash_text(*sorted(self.hashes), self.keep.pattern)
+
+    @classmethod
+    def learn(cls, files: Iterable[Path], threshold: float = 0.3,
+              keep_patterns: List[str] = KEEP_PATTERNS) -> "BoilerplateIndex":
+        """Flag lines found in more than threshold of the files (one file per patient)."""
+        keep = compile_keep_patterns(keep_patterns)
+        document_frequency = Counter()
+        patients = 0
+
+        for file_path in files:
+            patients += 1
+            with open(file_path, 'r', encoding='utf-8') as f:
+                hashes = {line_hash(line) for line in f if line.strip() and not keep.search(line.strip())}
+            document_frequency.update(hashes)
+
+        min_count = threshold * patients
+        flagged = {h for h, count in document_frequency.items() if count > min_count}
+        return cls(flagged, patients, threshold, keep_patterns)
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_INDEX_PATH) -> "BoilerplateIndex":
+        """Load an index written by save()."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(set(data['hashes']), data['patients'], data['threshold'])
+
+    def save(self, path: Path = DEFAULT_INDEX_PATH) -> None:
+        """Write the index as JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'patients': self.patients,
+                'threshold': self.threshold,
+                'hashes': sorted(self.hashes),
+            }, f, indent=2)
+
+    def strip(self, lines: Iterable[str]) -> List[str]:
+        """Return the lines that are not boilerplate.
+
+        Keep patterns are checked again, so an index learned before a pattern
+        was added never strips the labels it protects.
+        """
+        hashes, keep = self.hashes, self.keep
+        return [line for line in lines if line_hash(line) not in hashes or keep.search(line.strip())]
+
+    def strip_with_savings(self, lines: List[str]) -> Tuple[List[str], int]:
+        """Strip boilerplate and return (kept lines, estimated tokens removed)."""
+        kept = self.strip(lines)
+        saved = estimate_tokens('\n'.join(lines)) - estimate_tokens('\n'.join(kept))
+        return kept, saved
+
+def report(input_dir: Path, index: BoilerplateIndex) -> None:
+    """Print the estimated tokens saved per file and in total."""
+    total_before = total_saved = 0
+    for file_path in sorted(input_dir.glob('*.md')):
+        lines = file_path.read_text(encoding='utf-8').splitlines()
+        before = estimate_tokens('\n'.join(lines))
+        _, saved = index.strip_with_savings(lines)
+        total_before += before
+        total_saved += saved
+        print(f"{file_path.name}: {before} tokens, {saved} saved ({saved / before:.0%})" if before
+              else f"{file_path.name}: empty")
+    if total_before:
+        print(f"Total: {total_saved} of {total_before} tokens saved ({total_saved / total_before:.0%}),"
+              f" per extractor call")
+
+def main():
+    """Learn the boilerplate index from md-final, or report its savings."""
+    base_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="Learn template lines repeated across patients")
+    parser.add_argument("command", choices=["learn", "report"])
+    parser.add_argument("--input", type=Path, default=base_dir / "md-final",
+                        help="directory of cleaned patient files")
+    parser.add_argument("--index", type=Path, default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--threshold", type=float, default=0.3,
+                        help="flag lines present in more than this fraction of patients")
+    parser.add_argument("--min-patients", type=int, default=20,
+                        help="refuse to learn from fewer patients than this")
+    parser.add_argument("--reset", action="store_true",
+                        help="replace the existing index instead of extending it")
+    args = parser.parse_args()
+
+    if args.command == "learn":
+        index = BoilerplateIndex.learn(sorted(args.input.glob('*.md')), args.threshold)
+        if index.patients < args.min_patients:
+            print(f"Only {index.patients} patients in {args.input}; need {args.min_patients} to learn")
+            return
+        if args.index.exists() and not args.reset:
+            # md-final may already be stripped; keep what earlier runs learned
+            index.hashes |= BoilerplateIndex.load(args.index).hashes
+        index.save(args.index)
+        print(f"Learned {len(index.hashes)} boilerplate lines from {index.patients} patients")
+    else:
+        report(args.input, BoilerplateIndex.load(args.index))
+
+if __name__ == "__main__":
+    main()
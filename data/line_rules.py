@@ -0,0 +1,86 @@
+import json
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Pattern, Tuple
+
+from .manifest import hash_text
+
+DEFAULT_RULES_PATH = Path(__file__).parent / "clean-rules.json"
+
+def compile_alternation(patterns: List[str]) -> Optional[Pattern]:
+    """Compile a list of regexes into one alternation, or None if empty."""
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+
+class LineRules:
+    """Line removal and rewrite rules for cleaning merged notes.
+
+    All "remove" patterns are compiled into a single alternation searched
+    once per line, and "remove_full_line" patterns into one that must match
+    the whole stripped line. Rewrites apply re.sub to kept lines, optionally
+    only when their "only_if" regex matches.
+    """
+
+    def __init__(self, remove: Iterable[str], remove_full_line: Iterable[str] = (), rewrite: Iterable[dict] = ()):
+        remove, remove_full_line, rewrite = list(remove), list(remove_full_line), list(rewrite)
+        # Identifies the rule set, so outputs can be invalidated when it changes
+        self.fingerprint = hash_text(json.dumps([remove, remove_full_line, rewrite], sort_keys=True))
+        self.remove = compile_alternation(remove)
+        self.remove_full_line = compile_alternation(remove_full_line)
+        self.rewrites: List[Tuple[Optional[Pattern], Pattern, str]] = [
+            (re.compile(rule['only_if']) if rule.get('only_if') else None,
+             re.compile(rule['pattern']),
+             rule.get('replacement', ''))
+            for rule in rewrite
+        ]
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_RULES_PATH) -> "LineRules":
+        """Load rules from a JSON config file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config.get('remove', []), config.get('remove_full_line', []), config.get('rewrite', []))
+
+    def should_remove(self, line: str) -> bool:
+        """Check if a stripped line matches any removal rule."""
+        if self.remove_full_line is not None and self.remove_full_line.fullmatch(line):
+            return True
+        return self.remove is not None and self.remove.search(line) is not None
+
+    def rewrite(self, line: str) -> str:
+        """Apply the rewrite rules to a kept line."""
+        for only_if, pattern, replacement in self.rewrites:
+            if only_if is None or only_if.search(line):
+                line = pattern.sub(replacement, line).strip()
+        return line
+
+    def clean(self, lines: Iterable[str]) -> List[str]:
+        """Strip, filter, de-duplicate and rewrite a whole file's lines."""
+        search = self.remove.search if self.remove is not None else None
+        fullmatch = self.remove_full_line.fullmatch if self.remove_full_line is not None else None
+        rewrites = self.rewrites
+        seen_lines = set()
+        cleaned_lines = []
+
+        for line in lines:
+            line = line.strip()
+            if not line or line in seen_lines:
+                continue
+            if (fullmatch and fullmatch(line)) or (search and search(line)):
+                continue
+            if rewrites:
+                line = self.rewrite(line)
+            cleaned_lines.append(line)
+            seen_lines.add(line)
+
+        return cleaned_lines
+
+_default_rules: Optional[LineRules] = None
+
+def get_default_rules() -> LineRules:
+    """Return the rules from clean-rules.json, loaded once per process."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = LineRules.from_file(DEFAULT_RULES_PATH)
+    return _default_rules
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+def hash_file(file_path: Path, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_text(*parts: str) -> str:
+    """Return the SHA-256 hex digest of the given strings."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def stat_signature(paths: Iterable[Path]) -> Dict[str, List[int]]:
+    """Return {file name: [size, mtime_ns]} for the given files."""
+    signature = {}
+    for path in paths:
+        stat = path.stat()
+        signature[path.name] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+class Manifest:
+    """Persistent record of which source files produced which outputs.
+
+    Entries are keyed by source file name and store the content hash, the
+    size/mtime seen when it was hashed and a config key (tool version,
+    options...). A source is current when its config key matches and its
+    output exists; size and mtime let unchanged files be recognised without
+    reading them again.
+    """
+
+    def __init__(self, path: Path, config_key: str):
+        self.path = path
+        self.config_key = config_key
+        self.entries: Dict[str, dict] = {}
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('entries', {})
+
+    def check(self, source: Path, output: Path) -> Tuple[bool, Optional[str]]:
+        """Return (is_current, content hash if it had to be computed)."""
+        entry = self.entries.get(source.name)
+        stat = source.stat()
+
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['config'] == self.config_key and output.exists(), entry['sha256']
+
+        digest = hash_file(source)
+        if entry and entry['sha256'] == digest:
+            # Touched but unchanged: remember the new stat so it is not hashed again
+            entry['size'], entry['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+            return entry['config'] == self.config_key and output.exists(), digest
+        return False, digest
+
+    def record(self, source: Path, output: Path, digest: Optional[str] = None) -> None:
+        """Mark source as converted to output with the current config."""
+        stat = source.stat()
+        self.entries[source.name] = {
+            'sha256': digest or hash_file(source),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'config': self.config_key,
+            'output': output.name,
+        }
+
+    def check_group(self, key: str, sources: Iterable[Path], output: Path) -> bool:
+        """Check whether an output built from several sources is current.
+
+        Compares only the size and mtime of the sources, so nothing is read.
+        """
+        entry = self.entries.get(key)
+        return (entry is not None
+                and entry['config'] == self.config_key
+                and entry.get('sources') == stat_signature(sources)
+                and output.exists())
+
+    def record_group(self, key: str, sources: Iterable[Path], output: Path) -> None:
+        """Mark output as built from sources with the current config."""
+        self.entries[key] = {
+            'sources': stat_signature(sources),
+            'config': self.config_key,
+            'output': output.name,
+        }
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'entries': self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -1,7 +1,21 @@
 import os
+import sys
+import argparse
+import time
 from pathlib import Path
 import re
-from typing import List, Set
+from typing import List, Optional, Set
+
+# Add project root to Python path so we can import the data package
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from data.boilerplate import DEFAULT_INDEX_PATH, BoilerplateIndex
+from data.line_rules import LineRules, get_default_rules
+from data.manifest import Manifest, hash_text
+from data.preprocess import clean_file, print_throughput, run_jobs
+
+MANIFEST_NAME = ".clean-manifest.json"
 
 def load_file_content(file_path: Path) -> List[str]:
     """Read file content and return as list of lines."""
@@ -9,7 +23,10 @@ def load_file_content(file_path: Path) -> List[str]:
         return f.readlines()
 
 def should_remove_line(line: str) -> bool:
-    """Check if line should be removed based on patterns."""
+    """Check if line should be removed based on patterns.
+
+    Superseded by the rules in clean-rules.json; kept as the benchmark baseline.
+    """
     patterns_to_remove = [
         r'<!-- image -->',
         r'H\. SAO JOAO ALAMEDA',
@@ -36,8 +53,8 @@ def should_remove_line(line: str) -> bool:
         
     return any(re.search(pattern, line) for pattern in patterns_to_remove)
 
-def clean_content(lines: List[str]) -> List[str]:
-    """Clean and standardize content."""
+def clean_content_legacy(lines: List[str]) -> List[str]:
+    """Clean and standardize content with should_remove_line()."""
     seen_lines = set()
     cleaned_lines = []
     
@@ -67,32 +84,85 @@ def clean_content(lines: List[str]) -> List[str]:
     
     return cleaned_lines
 
-def process_directory(input_dir: Path, output_dir: Path) -> None:
-    """Process all .md files in directory."""
+def clean_content(lines: List[str], rules: Optional[LineRules] = None) -> List[str]:
+    """Clean and standardize content with the compiled rules."""
+    return (rules or get_default_rules()).clean(lines)
+
+def process_directory(input_dir: Path, output_dir: Path, rules: Optional[LineRules] = None,
+                      workers: int = 1, force: bool = False,
+                      boilerplate: Optional[BoilerplateIndex] = None) -> None:
+    """Process all .md files in directory, skipping files unchanged since the last run."""
     output_dir.mkdir(exist_ok=True)
+    rules = rules or get_default_rules()
+    config_key = hash_text(rules.fingerprint, boilerplate.fingerprint if boilerplate else "")
+    manifest = Manifest(output_dir / MANIFEST_NAME, config_key)
+
+    files = list(input_dir.glob('*.md'))
+    stale = [file_path for file_path in files
+             if force or not manifest.check_group(file_path.name, [file_path], output_dir / file_path.name)]
     
-    for file_path in input_dir.glob('*.md'):
-        print(f"Processing {file_path.name}")
-        
-        # Read and clean content
-        content = load_file_content(file_path)
-        cleaned_content = clean_content(content)
-        
-        # Write cleaned content
-        output_path = output_dir / file_path.name
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(cleaned_content))
-        
-        print(f"Saved cleaned file to {output_path}")
+    # Read, clean and write changed files
+    start = time.perf_counter()
+    jobs = [(file_path, output_dir / file_path.name, rules, boilerplate) for file_path in stale]
+    results = run_jobs(clean_file, jobs, workers)
+    elapsed = time.perf_counter() - start
+
+    for name, _ in results:
+        manifest.record_group(name, [input_dir / name], output_dir / name)
+        print(f"Saved cleaned file to {output_dir / name}")
+    manifest.save()
+
+    print_throughput("Clean", results, len(files) - len(stale), elapsed)
+
+def benchmark(input_dir: Path, rules: LineRules, repeat: int = 3) -> None:
+    """Compare the compiled rules with should_remove_line() on the same files."""
+    files = [load_file_content(file_path) for file_path in input_dir.glob('*.md')]
+    total_lines = sum(len(lines) for lines in files)
+    total_chars = sum(len(line) for lines in files for line in lines)
+    print(f"Benchmarking on {len(files)} files, {total_lines} lines, {total_chars} characters")
+
+    for name, clean in (("legacy", clean_content_legacy), ("compiled", rules.clean)):
+        best = min(_time_cleaning(clean, files) for _ in range(repeat))
+        rate = total_chars / best / 1e6 if best else float('inf')
+        print(f"{name:>8}: {best:.3f}s ({rate:.1f} MB/s)")
+
+    mismatches = sum(clean_content_legacy(lines) != rules.clean(lines) for lines in files)
+    print(f"Files with different output: {mismatches}")
+
+def _time_cleaning(clean, files: List[List[str]]) -> float:
+    """Return the seconds taken to clean every file once."""
+    start = time.perf_counter()
+    for lines in files:
+        clean(lines)
+    return time.perf_counter() - start
 
 def main():
     """Main execution function."""
     base_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="Clean merged patient notes")
+    parser.add_argument("--rules", type=Path, default=None,
+                        help="JSON rules file (default: clean-rules.json)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes")
+    parser.add_argument("--force", action="store_true",
+                        help="clean every file, even if unchanged since the last run")
+    parser.add_argument("--strip-boilerplate", action="store_true",
+                        help="also remove lines learned by boilerplate.py")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="time the compiled rules against the legacy patterns and exit")
+    args = parser.parse_args()
+
     input_dir = base_dir / "md-merged"
     output_dir = base_dir / "md-final"
+    rules = LineRules.from_file(args.rules) if args.rules else get_default_rules()
+
+    if args.benchmark:
+        benchmark(input_dir, rules)
+        return
     
     print("Starting cleanup process...")
-    process_directory(input_dir, output_dir)
+    boilerplate = BoilerplateIndex.load(DEFAULT_INDEX_PATH) if args.strip_boilerplate else None
+    process_directory(input_dir, output_dir, rules, args.workers, args.force, boilerplate)
     print("Cleanup complete!")
 
 if __name__ == "__main__":
@@ -1,79 +1,98 @@
 import os
+import sys
+import argparse
+import time
 from pathlib import Path
-from typing import Dict, List, Tuple
-from collections import defaultdict
+from typing import Optional
 
-def get_patient_id(filename: str) -> str:
-    """Extract patient ID from filename."""
-    return ''.join(filter(str.isdigit, filename))
+# Add project root to Python path so we can import the data package
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
 
-def get_file_type(filename: str) -> str:
-    """Get file type (E, A, O, BIC) from filename."""
-    suffix = ''.join(filter(str.isalpha, filename.split('.')[0]))
-    return suffix
+from data.boilerplate import DEFAULT_INDEX_PATH, BoilerplateIndex
+from data.line_rules import get_default_rules
+from data.manifest import Manifest, hash_text
+from data.preprocess import (
+    SECTION_TYPES,
+    group_files_by_patient,
+    merge_patient,
+    preprocess_patient_file,
+    print_throughput,
+    run_jobs,
+    stale_patients,
+)
 
-def read_file_content(file_path: Path) -> str:
-    """Read file content and remove empty lines."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        return ''.join(line for line in lines if line.strip())
+MANIFEST_NAME = ".merge-manifest.json"
+SINGLE_PASS_MANIFEST_NAME = ".preprocess-manifest.json"
 
-def group_files_by_patient(source_dir: Path) -> Dict[str, Dict[str, Path]]:
-    """Group files by patient ID and type."""
-    patient_files = defaultdict(dict)
-    for file_path in source_dir.glob('*.md'):
-        patient_id = get_patient_id(file_path.name)
-        file_type = get_file_type(file_path.name)
-        patient_files[patient_id][file_type] = file_path
-    return patient_files
+def merge_patient_files(source_dir: Path, target_dir: Path, workers: int = 1,
+                        force: bool = False, clean: bool = False,
+                        boilerplate: Optional[BoilerplateIndex] = None) -> None:
+    """Main function to merge files.
 
-def create_merged_content(file_group: Dict[str, Path]) -> str:
-    """Create merged content with proper section markers."""
-    sections = []
-    
-    # Order: E -> A -> BIC -> O
-    section_types = {
-        'E': 'unit admission note',
-        'A': 'unit discharge note',
-        'BIC': 'death notice information',
-        'O': 'death certificate'
-    }
-    
-    for file_type, section_name in section_types.items():
-        if file_type in file_group:
-            content = read_file_content(file_group[file_type])
-            sections.append(f"\n>> {section_name} <<\n{content}\n>> END {section_name} <<\n")
-    
-    return ''.join(sections)
-
-def merge_patient_files(source_dir: Path, target_dir: Path) -> None:
-    """Main function to merge files."""
+    Only patients whose notes changed since the last run are rewritten. With
+    clean=True the notes are merged and cleaned in one pass, stripping the
+    learned boilerplate if an index is given.
+    """
     print(f"Reading files from {source_dir}")
     target_dir.mkdir(exist_ok=True)
     
     # Group files by patient
     patient_files = group_files_by_patient(source_dir)
     print(f"Found {len(patient_files)} patients to process")
+
+    if clean:
+        rules = get_default_rules()
+        manifest = Manifest(target_dir / SINGLE_PASS_MANIFEST_NAME,
+                            hash_text(repr(SECTION_TYPES), rules.fingerprint,
+                                      boilerplate.fingerprint if boilerplate else ""))
+        job, extra_args = preprocess_patient_file, (target_dir, rules, boilerplate)
+    else:
+        manifest = Manifest(target_dir / MANIFEST_NAME, hash_text(repr(SECTION_TYPES)))
+        job, extra_args = merge_patient, (target_dir,)
+
+    stale = patient_files if force else stale_patients(patient_files, target_dir, manifest)
     
-    # Process each patient's files
-    for patient_id, file_group in patient_files.items():
-        output_path = target_dir / f"{patient_id}.md"
-        merged_content = create_merged_content(file_group)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(merged_content)
-        
+    # Process each changed patient's files
+    start = time.perf_counter()
+    results = run_jobs(job, [(patient_id, file_group, *extra_args) for patient_id, file_group in stale.items()],
+                       workers)
+    elapsed = time.perf_counter() - start
+
+    for patient_id, _ in results:
+        manifest.record_group(patient_id, patient_files[patient_id].values(), target_dir / f"{patient_id}.md")
         print(f"Created merged file for patient {patient_id}")
+    manifest.save()
+
+    print_throughput("Merge", results, len(patient_files) - len(stale), elapsed)
 
 def main():
     """Main execution function."""
     base_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="Merge each patient's notes into one file")
+    parser.add_argument("--clean", action="store_true",
+                        help="merge and clean in one pass, writing straight to md-final")
+    parser.add_argument("--strip-boilerplate", action="store_true",
+                        help="with --clean, also remove lines learned by boilerplate.py")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes")
+    parser.add_argument("--force", action="store_true",
+                        help="rewrite every patient, even if its notes are unchanged")
+    args = parser.parse_args()
+
     source_dir = base_dir / "md-from-pdf"
-    target_dir = base_dir / "md-final"
-    
+
+    if args.clean:
+        print("Starting single-pass merge and cleanup...")
+        boilerplate = BoilerplateIndex.load(DEFAULT_INDEX_PATH) if args.strip_boilerplate else None
+        merge_patient_files(source_dir, base_dir / "md-final", args.workers, args.force,
+                            clean=True, boilerplate=boilerplate)
+        print("Merge and cleanup complete!")
+        return
+
     print("Starting file merge process...")
-    merge_patient_files(source_dir, target_dir)
+    merge_patient_files(source_dir, base_dir / "md-merged", args.workers, args.force)
     print("Merge complete!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
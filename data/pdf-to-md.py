@@ -1,10 +1,50 @@
 import os
+import sys
+import argparse
+import gc
+import gzip
+import json
+import resource
+import time
+from io import BytesIO
+from importlib.metadata import version
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
-from docling.document_converter import DocumentConverter
-from docling.datamodel.base_models import InputFormat
+from docling.document_converter import DocumentConverter, PdfFormatOption
+from docling.datamodel.base_models import DocumentStream, InputFormat
 from docling.datamodel.pipeline_options import PdfPipelineOptions
+from docling_core.types.doc import DoclingDocument, SectionHeaderItem, TableItem, TextItem, TitleItem
+import pypdfium2 as pdfium
+
+# Add project root to Python path so we can import the data package
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from data.manifest import Manifest, hash_text
+
+MANIFEST_NAME = ".conversion-manifest.json"
+
+# Serialized DoclingDocument kept next to each Markdown file
+DOCUMENT_CACHE_SUFFIX = ".docling.json.gz"
+
+# Conversion profiles: "full" runs OCR and table structure, "fast" only
+# reads the embedded text layer of born-digital PDFs
+PROFILES = ("full", "fast")
+
+# Pages with fewer extractable characters are treated as scanned
+MIN_TEXT_CHARS_PER_PAGE = 20
+
+# Warmed converters of the current process, one per profile, see get_converter()
+_converters: Dict[str, DocumentConverter] = {}
+# Threads per converter in this process, set by init_worker(); converters
+# rebuilt after release_memory() use it too
+_num_threads = 4
+# RSS right after the converters were last built; when it is already above the
+# memory ceiling, dropping and reloading the models cannot get under it
+_loaded_rss_mb = 0.0
+_ceiling_warned = False
 
 def log_message(message: str) -> None:
     """Print timestamped log message."""
@@ -33,57 +73,399 @@ def file_exists(pdf_path: Path, output_dir: Path) -> bool:
     md_path = output_dir / f"{pdf_path.stem}.md"
     return md_path.exists()
 
-def convert_pdf_to_md(pdf_path: Path, output_dir: Path, current: int, total: int) -> None:
-    """Convert single PDF to Markdown, preserving Portuguese characters."""
+def build_pipeline_options(profile: str = "full", num_threads: int = 4) -> PdfPipelineOptions:
+    """Return the PDF pipeline options for a conversion profile."""
+    pipeline_options = PdfPipelineOptions()
+    fast = profile == "fast"
+    pipeline_options.do_ocr = not fast
+    pipeline_options.do_table_structure = not fast
+    # md-final-clean.py drops <!-- image --> placeholders, so never render images
+    pipeline_options.generate_picture_images = False
+    pipeline_options.generate_page_images = False
+    pipeline_options.accelerator_options.num_threads = num_threads
+    return pipeline_options
+
+def conversion_config_key(mode: str, window_pages: int = 0) -> str:
+    """Hash of everything besides the PDF itself that determines the Markdown output.
+
+    window_pages is included because windowed conversion splits the layout
+    analysis (and the Markdown) at window boundaries; it is left out when 0 so
+    the key of unwindowed runs is unchanged.
+    """
+    options = [build_pipeline_options(profile).model_dump_json(exclude={"accelerator_options"})
+               for profile in PROFILES]
+    windowing = [f"window_pages={window_pages}"] if window_pages else []
+    return hash_text(version("docling"), mode, str(MIN_TEXT_CHARS_PER_PAGE), *windowing, *options)
+
+def has_text_layer(pdf_path: Path) -> bool:
+    """Check whether every page of the PDF carries an embedded text layer."""
+    pdf = pdfium.PdfDocument(str(pdf_path))
     try:
-        log_message(f"Processing [{current}/{total}]: {pdf_path.name}")
-        
-        if file_exists(pdf_path, output_dir):
-            log_message(f"Skipping {pdf_path.name} - MD file already exists")
-            return
-        
-        pipeline_options = PdfPipelineOptions()
-        pipeline_options.do_table_structure = True
-        converter = DocumentConverter()
-        
-        log_message(f"Converting {pdf_path.name}...")
-        result = converter.convert(str(pdf_path))
-        
-        output_path = output_dir / f"{pdf_path.stem}.md"
-        markdown_text = result.document.export_to_markdown()
-        
+        for page in pdf:
+            textpage = page.get_textpage()
+            chars = textpage.count_chars()
+            textpage.close()
+            page.close()
+            if chars < MIN_TEXT_CHARS_PER_PAGE:
+                return False
+        return True
+    finally:
+        pdf.close()
+
+def choose_profile(pdf_path: Path, mode: str) -> str:
+    """Pick the conversion profile for a PDF.
+
+    In "auto" mode born-digital documents take the fast profile. A document
+    with any scanned page goes through the full pipeline, where Docling only
+    OCRs the bitmap regions and keeps the text layer of the other pages.
+    """
+    if mode == "full":
+        return "full"
+    try:
+        return "fast" if has_text_layer(pdf_path) else "full"
+    except Exception as e:
+        log_message(f"Could not inspect text layer of {pdf_path.name}: {str(e)}")
+        return "full"
+
+def find_stale_files(pdf_files: List[Path], output_dir: Path, manifest: Manifest) -> List[Tuple[Path, str]]:
+    """Return (PDF, content hash) for files whose Markdown is missing or out of date."""
+    stale = []
+    for pdf_path in pdf_files:
+        current, digest = manifest.check(pdf_path, output_dir / f"{pdf_path.stem}.md")
+        if not current:
+            stale.append((pdf_path, digest))
+    return stale
+
+def document_cache_path(pdf_stem: str, output_dir: Path) -> Path:
+    """Return the path of the cached Docling document for a PDF."""
+    return output_dir / f"{pdf_stem}{DOCUMENT_CACHE_SUFFIX}"
+
+def save_document_cache(document: DoclingDocument, cache_path: Path, append: bool = False) -> None:
+    """Store the Docling document as one line of gzipped JSON.
+
+    Windowed conversions append one document per page window.
+    """
+    with gzip.open(cache_path, 'at' if append else 'wt', encoding='utf-8') as f:
+        f.write(json.dumps(document.export_to_dict(), ensure_ascii=False) + "\n")
+
+def load_document_cache(cache_path: Path) -> Iterator[DoclingDocument]:
+    """Yield the Docling documents stored by save_document_cache(), one at a time."""
+    with gzip.open(cache_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield DoclingDocument.model_validate_json(line)
+
+def export_sections(document: DoclingDocument) -> Dict[str, str]:
+    """Return the document text grouped by section header, in reading order."""
+    sections: Dict[str, List[str]] = {"": []}
+    current = ""
+    for item, _ in document.iterate_items():
+        if isinstance(item, (SectionHeaderItem, TitleItem)):
+            current = item.text
+            sections.setdefault(current, [])
+        elif isinstance(item, TableItem):
+            sections[current].append(item.export_to_markdown(document))
+        elif isinstance(item, TextItem):
+            sections[current].append(item.text)
+    return {name: "\n".join(lines) for name, lines in sections.items() if lines}
+
+def write_outputs(documents: Iterable[DoclingDocument], pdf_stem: str, output_dir: Path,
+                  fmt: str = "markdown") -> Path:
+    """Write one export format of a PDF's Docling document(s) and return its path.
+
+    Documents are consumed one at a time; windowed conversions give several.
+    """
+    if fmt == "json":
+        output_path = output_dir / f"{pdf_stem}.doc.json"
+        exported = [document.export_to_dict() for document in documents]
+        content = json.dumps(exported[0] if len(exported) == 1 else exported, indent=2, ensure_ascii=False)
+    elif fmt == "sections":
+        output_path = output_dir / f"{pdf_stem}.sections.json"
+        sections: Dict[str, str] = {}
+        for document in documents:
+            for name, text in export_sections(document).items():
+                sections[name] = f"{sections[name]}\n{text}" if name in sections else text
+        content = json.dumps(sections, indent=2, ensure_ascii=False)
+    else:
+        output_path = output_dir / f"{pdf_stem}.md"
+        content = "\n\n".join(document.export_to_markdown() for document in documents)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return output_path
+
+def reexport(output_dir: Path, fmt: str) -> None:
+    """Regenerate an export format from the cached documents, without converting."""
+    cache_files = sorted(output_dir.glob(f"*{DOCUMENT_CACHE_SUFFIX}"))
+    log_message(f"Re-exporting {len(cache_files)} cached documents as {fmt}")
+    start = time.perf_counter()
+    for cache_path in cache_files:
+        pdf_stem = cache_path.name[:-len(DOCUMENT_CACHE_SUFFIX)]
+        try:
+            write_outputs(load_document_cache(cache_path), pdf_stem, output_dir, fmt)
+        except Exception as e:
+            log_message(f"ERROR re-exporting {cache_path.name}: {str(e)}")
+    log_message(f"Re-export done in {time.perf_counter() - start:.2f}s")
+
+def current_rss_mb() -> float:
+    """Return the resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        # Not Linux: fall back to the peak RSS (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def release_memory(max_rss_mb: int) -> bool:
+    """Try to get back under the memory ceiling; return True if it worked."""
+    global _ceiling_warned
+    if not max_rss_mb or current_rss_mb() <= max_rss_mb:
+        return True
+    gc.collect()
+    if current_rss_mb() <= max_rss_mb:
+        return True
+    if _loaded_rss_mb > max_rss_mb:
+        # The models alone exceed the ceiling: reloading them for every window would only slow down
+        if not _ceiling_warned:
+            log_message(f"WARNING: worker {os.getpid()} uses {_loaded_rss_mb:.0f} MB with its models loaded, "
+                        f"above --max-rss-mb {max_rss_mb}; keeping the models")
+            _ceiling_warned = True
+        return False
+    # Drop the warmed converters and their caches; they are rebuilt on demand
+    _converters.clear()
+    gc.collect()
+    return current_rss_mb() <= max_rss_mb
+
+def convert_in_windows(pdf_path: Path, output_dir: Path, profile: str,
+                       window_pages: int, max_rss_mb: int) -> Path:
+    """Convert a long PDF a few pages at a time, appending Markdown as it goes.
+
+    Each window is split off with pypdfium2 and converted on its own, so peak
+    memory follows the window size instead of the page count. When the process
+    exceeds max_rss_mb the window is halved for the remaining pages.
+    """
+    output_path = output_dir / f"{pdf_path.stem}.md"
+    cache_path = document_cache_path(pdf_path.stem, output_dir)
+    source = pdfium.PdfDocument(str(pdf_path))
+    try:
+        num_pages = len(source)
+        start = 0
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_text)
-            
-        log_message(f"Successfully saved: {output_path.name}")
-        
+            while start < num_pages:
+                end = min(start + window_pages, num_pages)
+                window = pdfium.PdfDocument.new()
+                window.import_pages(source, list(range(start, end)))
+                buffer = BytesIO()
+                window.save(buffer)
+                window.close()
+                buffer.seek(0)
+
+                stream = DocumentStream(name=f"{pdf_path.stem}-p{start + 1}-{end}.pdf", stream=buffer)
+                document = get_converter(profile).convert(stream).document
+                save_document_cache(document, cache_path, append=start > 0)
+                if start > 0:
+                    f.write("\n\n")
+                f.write(document.export_to_markdown())
+                f.flush()
+                del document, stream, buffer
+
+                log_message(f"{pdf_path.name}: pages {start + 1}-{end}/{num_pages}, "
+                            f"RSS {current_rss_mb():.0f} MB")
+                start = end
+                if not release_memory(max_rss_mb) and window_pages > 1:
+                    window_pages = max(1, window_pages // 2)
+                    log_message(f"{pdf_path.name}: above {max_rss_mb} MB, window reduced to {window_pages} pages")
+    finally:
+        source.close()
+    return output_path
+
+def build_converter(profile: str = "full", num_threads: int = 4) -> DocumentConverter:
+    """Create a DocumentConverter with the profile's pipeline options applied."""
+    pipeline_options = build_pipeline_options(profile, num_threads)
+    converter = DocumentConverter(
+        format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
+    )
+    # Load the layout/table models now instead of on the first PDF
+    converter.initialize_pipeline(InputFormat.PDF)
+    return converter
+
+def get_converter(profile: str = "full") -> DocumentConverter:
+    """Return the process's converter for a profile, building it on first use."""
+    global _loaded_rss_mb
+    if profile not in _converters:
+        _converters[profile] = build_converter(profile, _num_threads)
+        _loaded_rss_mb = current_rss_mb()
+    return _converters[profile]
+
+def init_worker(num_threads: int, mode: str) -> None:
+    """Process pool initializer: warm up the converters once per worker."""
+    global _num_threads
+    _num_threads = num_threads
+    profiles = PROFILES if mode == "auto" else (mode,)
+    log_message(f"Worker {os.getpid()} loading models ({num_threads} threads)")
+    for profile in profiles:
+        get_converter(profile)
+
+def count_pages(pdf_path: Path) -> int:
+    """Return the number of pages of a PDF."""
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+def convert_pdf_to_md(pdf_path: Path, output_dir: Path, current: int, total: int, mode: str = "auto",
+                      window_pages: int = 0, max_rss_mb: int = 0) -> Tuple[str, bool, float]:
+    """Convert single PDF to Markdown, preserving Portuguese characters.
+
+    Returns (file name, success, seconds spent converting).
+    """
+    start = time.perf_counter()
+    try:
+        log_message(f"Processing [{current}/{total}]: {pdf_path.name}")
+        profile = choose_profile(pdf_path, mode)
+        if not release_memory(max_rss_mb):
+            log_message(f"WARNING: worker {os.getpid()} above {max_rss_mb} MB before {pdf_path.name}")
+
+        if window_pages and count_pages(pdf_path) > window_pages:
+            log_message(f"Converting {pdf_path.name} ({profile} profile, {window_pages}-page windows)...")
+            output_path = convert_in_windows(pdf_path, output_dir, profile, window_pages, max_rss_mb)
+        else:
+            log_message(f"Converting {pdf_path.name} ({profile} profile)...")
+            result = get_converter(profile).convert(str(pdf_path))
+            save_document_cache(result.document, document_cache_path(pdf_path.stem, output_dir))
+            output_path = write_outputs([result.document], pdf_path.stem, output_dir)
+            del result
+            release_memory(max_rss_mb)
+
+        elapsed = time.perf_counter() - start
+        log_message(f"Successfully saved: {output_path.name} ({elapsed:.1f}s)")
+        return pdf_path.name, True, elapsed
+
     except Exception as e:
         log_message(f"ERROR converting {pdf_path.name}: {str(e)}")
+        return pdf_path.name, False, time.perf_counter() - start
+
+def convert_files(pdf_files: List[Path], output_dir: Path, workers: int, mode: str = "auto",
+                  window_pages: int = 0, max_rss_mb: int = 0, manifest: Optional[Manifest] = None,
+                  digests: Optional[Dict[str, Optional[str]]] = None) -> List[Tuple[str, bool, float]]:
+    """Convert PDFs serially or over a process pool, with warmed converters per worker.
+
+    Each successful conversion is recorded in manifest (with its digest, when
+    known) and saved as soon as it finishes, so an interrupted run keeps them.
+    """
+    total = len(pdf_files)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    digests = digests or {}
+    timings = []
+
+    def finish(pdf: Path, timing: Tuple[str, bool, float]) -> None:
+        timings.append(timing)
+        if manifest is not None and timing[1]:
+            manifest.record(pdf, output_dir / f"{pdf.stem}.md", digests.get(pdf.name))
+            manifest.save()
+
+    if workers <= 1:
+        init_worker(threads_per_worker, mode)
+        for idx, pdf in enumerate(pdf_files, 1):
+            finish(pdf, convert_pdf_to_md(pdf, output_dir, idx, total, mode, window_pages, max_rss_mb))
+        return timings
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(threads_per_worker, mode)) as pool:
+        futures = {pool.submit(convert_pdf_to_md, pdf, output_dir, idx, total, mode, window_pages, max_rss_mb): pdf
+                   for idx, pdf in enumerate(pdf_files, 1)}
+        for future in as_completed(futures):
+            finish(futures[future], future.result())
+    return timings
+
+def report_timings(timings: List[Tuple[str, bool, float]], wall_time: float) -> None:
+    """Log per-file timings and overall throughput."""
+    converted = [t for t in timings if t[1] and t[2] > 0]
+    failed = [t for t in timings if not t[1]]
+
+    log_message("Per-file conversion times:")
+    for name, ok, seconds in sorted(timings, key=lambda t: t[2], reverse=True):
+        status = "ok" if ok else "FAILED"
+        log_message(f"- {name}: {seconds:.1f}s ({status})")
+
+    if converted:
+        busy = sum(t[2] for t in converted)
+        log_message(f"Mean per file: {busy / len(converted):.1f}s")
+    if wall_time > 0:
+        log_message(f"Wall time: {wall_time:.1f}s ({len(timings) / wall_time * 60:.1f} files/min)")
+    if failed:
+        log_message(f"- Failed: {len(failed)}")
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Convert hospital PDFs to Markdown with Docling")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4),
+                        help="number of worker processes, each holding one converter")
+    parser.add_argument("--mode", choices=["auto", "full"], default="auto",
+                        help="auto: skip OCR and table models for PDFs with a text layer; full: always run them")
+    parser.add_argument("--window-pages", type=int, default=0,
+                        help="convert PDFs longer than this many pages in page windows (0: never)")
+    parser.add_argument("--max-rss-mb", type=int, default=0,
+                        help="per-worker memory ceiling; windows shrink and models are reloaded above it")
+    parser.add_argument("--reexport", choices=["markdown", "json", "sections"],
+                        help="rebuild this output from the cached Docling documents and exit")
+    parser.add_argument("--force", action="store_true",
+                        help="reconvert every PDF regardless of the manifest")
+    parser.add_argument("--adopt-existing", action="store_true",
+                        help="record existing Markdown files in the manifest without reconverting")
+    return parser.parse_args()
 
 def main():
     """Main execution function."""
+    args = parse_args()
     log_message("Starting PDF to Markdown conversion")
     pdf_dir, md_dir = setup_directories()
+
+    if args.reexport:
+        reexport(md_dir, args.reexport)
+        return
+
     pdf_files = get_pdf_files(pdf_dir)
-    
+
     if not pdf_files:
         log_message("No PDF files found. Exiting.")
         return
-    
+
     total_files = len(pdf_files)
-    converted = 0
-    skipped = 0
-    
-    for idx, pdf_file in enumerate(pdf_files, 1):
-        if file_exists(pdf_file, md_dir):
-            skipped += 1
-        else:
-            converted += 1
-        convert_pdf_to_md(pdf_file, md_dir, idx, total_files)
-    
+    manifest = Manifest(md_dir / MANIFEST_NAME, conversion_config_key(args.mode, args.window_pages))
+
+    if args.adopt_existing:
+        adopted = [pdf for pdf in pdf_files if pdf.name not in manifest.entries and file_exists(pdf, md_dir)]
+        for pdf in adopted:
+            manifest.record(pdf, md_dir / f"{pdf.stem}.md")
+        manifest.save()
+        log_message(f"Adopted {len(adopted)} existing Markdown files into the manifest")
+
+    if args.force:
+        stale = [(pdf, None) for pdf in pdf_files]
+    else:
+        stale = find_stale_files(pdf_files, md_dir, manifest)
+        manifest.save()
+    skipped = total_files - len(stale)
+
+    if not stale:
+        log_message(f"All {total_files} files up to date. Exiting.")
+        return
+
+    pending = [pdf for pdf, _ in stale]
+    digests = {pdf.name: digest for pdf, digest in stale}
+    workers = max(1, min(args.workers, len(pending)))
+    log_message(f"Converting {len(pending)} new or changed files with {workers} worker(s)")
+    start = time.perf_counter()
+    timings = convert_files(pending, md_dir, workers, args.mode, args.window_pages, args.max_rss_mb,
+                            manifest, digests)
+    report_timings(timings, time.perf_counter() - start)
+
     log_message(f"Conversion complete. Processed {total_files} files:")
-    log_message(f"- Converted: {converted}")
+    log_message(f"- Converted: {sum(1 for t in timings if t[1])}")
     log_message(f"- Skipped: {skipped}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
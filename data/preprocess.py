@@ -0,0 +1,158 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from collections import defaultdict
+
+from .boilerplate import BoilerplateIndex
+from .line_rules import LineRules, get_default_rules
+from .manifest import Manifest
+
+# Order: E -> A -> BIC -> O
+SECTION_TYPES = {
+    'E': 'unit admission note',
+    'A': 'unit discharge note',
+    'BIC': 'death notice information',
+    'O': 'death certificate'
+}
+
+def get_patient_id(filename: str) -> str:
+    """Extract patient ID from filename."""
+    return ''.join(filter(str.isdigit, filename))
+
+def get_file_type(filename: str) -> str:
+    """Get file type (E, A, O, BIC) from filename."""
+    suffix = ''.join(filter(str.isalpha, filename.split('.')[0]))
+    return suffix
+
+def read_file_content(file_path: Path) -> str:
+    """Read file content and remove empty lines."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+        return ''.join(line for line in lines if line.strip())
+
+def group_files_by_patient(source_dir: Path) -> Dict[str, Dict[str, Path]]:
+    """Group files by patient ID and type."""
+    patient_files = defaultdict(dict)
+    for file_path in source_dir.glob('*.md'):
+        patient_id = get_patient_id(file_path.name)
+        file_type = get_file_type(file_path.name)
+        patient_files[patient_id][file_type] = file_path
+    return patient_files
+
+def create_merged_content(file_group: Dict[str, Path]) -> str:
+    """Create merged content with proper section markers."""
+    sections = []
+
+    for file_type, section_name in SECTION_TYPES.items():
+        if file_type in file_group:
+            content = read_file_content(file_group[file_type])
+            sections.append(f"\n>> {section_name} <<\n{content}\n>> END {section_name} <<\n")
+
+    return ''.join(sections)
+
+def iter_merged_lines(file_group: Dict[str, Path]) -> Iterator[str]:
+    """Yield the lines of create_merged_content() while reading each note once."""
+    for file_type, section_name in SECTION_TYPES.items():
+        if file_type in file_group:
+            yield f">> {section_name} <<"
+            with open(file_group[file_type], 'r', encoding='utf-8') as f:
+                yield from f
+            yield f">> END {section_name} <<"
+
+def preprocess_patient(file_group: Dict[str, Path], rules: Optional[LineRules] = None,
+                       output_path: Optional[Path] = None,
+                       boilerplate: Optional[BoilerplateIndex] = None) -> str:
+    """Merge and clean one patient's E/A/BIC/O notes in a single pass.
+
+    Returns the same text as md-merge-files.py followed by md-final-clean.py,
+    without intermediate files. The text is also written to output_path if given.
+    """
+    cleaned_lines = (rules or get_default_rules()).clean(iter_merged_lines(file_group))
+    if boilerplate is not None:
+        cleaned_lines, saved = boilerplate.strip_with_savings(cleaned_lines)
+        name = output_path.name if output_path is not None else "merged note"
+        print(f"{name}: {saved} boilerplate tokens removed")
+    text = '\n'.join(cleaned_lines)
+
+    if output_path is not None:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return text
+
+def preprocess_directory(source_dir: Path, output_dir: Optional[Path] = None,
+                         rules: Optional[LineRules] = None) -> Dict[str, str]:
+    """Merge and clean every patient in source_dir, keyed by patient ID."""
+    rules = rules or get_default_rules()
+    if output_dir is not None:
+        output_dir.mkdir(exist_ok=True)
+
+    results = {}
+    for patient_id, file_group in group_files_by_patient(source_dir).items():
+        output_path = output_dir / f"{patient_id}.md" if output_dir is not None else None
+        results[patient_id] = preprocess_patient(file_group, rules, output_path)
+    return results
+
+def merge_patient(patient_id: str, file_group: Dict[str, Path], target_dir: Path) -> Tuple[str, int]:
+    """Write one patient's merged file; return (patient ID, characters written)."""
+    merged_content = create_merged_content(file_group)
+    with open(target_dir / f"{patient_id}.md", 'w', encoding='utf-8') as f:
+        f.write(merged_content)
+    return patient_id, len(merged_content)
+
+def clean_file(input_path: Path, output_path: Path, rules: LineRules,
+               boilerplate: Optional[BoilerplateIndex] = None) -> Tuple[str, int]:
+    """Write the cleaned version of one merged file; return (file name, characters read)."""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    cleaned_lines = rules.clean(lines)
+    if boilerplate is not None:
+        cleaned_lines, saved = boilerplate.strip_with_savings(cleaned_lines)
+        print(f"{input_path.name}: {saved} boilerplate tokens removed")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(cleaned_lines))
+    return input_path.name, sum(len(line) for line in lines)
+
+def preprocess_patient_file(patient_id: str, file_group: Dict[str, Path], output_dir: Path,
+                            rules: LineRules, boilerplate: Optional[BoilerplateIndex] = None) -> Tuple[str, int]:
+    """Merge and clean one patient into output_dir; return (patient ID, characters written)."""
+    text = preprocess_patient(file_group, rules, output_dir / f"{patient_id}.md", boilerplate)
+    return patient_id, len(text)
+
+def stale_patients(patient_files: Dict[str, Dict[str, Path]], output_dir: Path,
+                   manifest: Manifest) -> Dict[str, Dict[str, Path]]:
+    """Return the patients whose source notes changed since their output was written."""
+    return {
+        patient_id: file_group
+        for patient_id, file_group in patient_files.items()
+        if not manifest.check_group(patient_id, file_group.values(), output_dir / f"{patient_id}.md")
+    }
+
+def run_jobs(job: Callable[..., Tuple[str, int]], jobs: List[tuple], workers: int = 1) -> List[Tuple[str, int]]:
+    """Run job(*args) for every args tuple, over a process pool when workers > 1.
+
+    Failed jobs are reported and left out of the results.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        results = []
+        for args in jobs:
+            try:
+                results.append(job(*args))
+            except Exception as e:
+                print(f"Error processing {args[0]}: {str(e)}")
+        return results
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(job, *args): args[0] for args in jobs}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Error processing {futures[future]}: {str(e)}")
+    return results
+
+def print_throughput(stage: str, results: List[Tuple[str, int]], skipped: int, seconds: float) -> None:
+    """Print a one-line throughput summary for a preprocessing stage."""
+    chars = sum(size for _, size in results)
+    rate = f"{len(results) / seconds:.1f} files/s, {chars / seconds / 1e6:.2f} MB/s" if seconds > 0 else "n/a"
+    print(f"{stage}: {len(results)} processed, {skipped} unchanged, {seconds:.2f}s ({rate})")
@@ -0,0 +1,99 @@
+from pathlib import Path
+import argparse
+import json
+import socket
+import sys
+import time
+
+# Add parent directory to Python path so we can import settings
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from settings import WORKER_LOG_PATH, WORKER_SOCKET_PATH
+
+# Thin client for extraction_worker.py. It only imports the standard library
+# and settings, so it starts in milliseconds; the extractors, pydantic-ai and
+# the model clients stay warm in the worker.
+#   python extract_client.py --start data/md-final/2301.md
+#   python extract_client.py --ping | --stop
+
+def send(socket_path: str, request: dict, timeout: float = None) -> dict:
+    """Send one request to the worker and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as stream:
+            line = stream.readline()
+    if not line:
+        raise ConnectionError("Worker closed the connection without a response")
+    return json.loads(line)
+
+def is_running(socket_path: str) -> bool:
+    try:
+        return send(socket_path, {"action": "ping"}, timeout=2).get("status") == "ok"
+    except (OSError, ValueError):
+        return False
+
+def start_worker(socket_path: str, wait_seconds: float = 60) -> bool:
+    """Start the worker in the background and wait until it answers."""
+    import subprocess
+
+    log_path = project_root / WORKER_LOG_PATH
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "ab") as log:
+        subprocess.Popen([sys.executable, str(project_root / "extraction_worker.py"), "--socket", socket_path],
+                         stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                         start_new_session=True, cwd=project_root)
+    deadline = time.monotonic() + wait_seconds
+    while time.monotonic() < deadline:
+        if is_running(socket_path):
+            return True
+        time.sleep(0.1)
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract patient notes through the long-lived extraction worker")
+    parser.add_argument("inputs", nargs="*", type=Path, help="patient .md files")
+    parser.add_argument("--output-dir", type=Path, default=project_root / "data" / "json")
+    parser.add_argument("--socket", default=WORKER_SOCKET_PATH)
+    parser.add_argument("--start", action="store_true", help="start the worker if it is not running")
+    parser.add_argument("--ping", action="store_true", help="check whether the worker is running")
+    parser.add_argument("--stop", action="store_true", help="stop the worker")
+    args = parser.parse_args()
+
+    if args.ping:
+        running = is_running(args.socket)
+        print("Worker is running" if running else "Worker is not running")
+        sys.exit(0 if running else 1)
+    if args.stop:
+        if is_running(args.socket):
+            send(args.socket, {"action": "shutdown"}, timeout=10)
+            print("Worker stopped")
+        return
+
+    if not is_running(args.socket):
+        if not args.start:
+            print(f"No worker on {args.socket}; run extraction_worker.py or pass --start")
+            sys.exit(1)
+        print("Starting extraction worker...")
+        if not start_worker(args.socket):
+            print(f"Worker did not start, see {project_root / WORKER_LOG_PATH}")
+            sys.exit(1)
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    failed = 0
+    for file_path in args.inputs:
+        response = send(args.socket, {"action": "extract", "file": str(file_path.resolve())})
+        if response.get("status") != "ok":
+            failed += 1
+            print(f"✗ {file_path.name}: {response.get('error', 'extraction failed')}")
+            continue
+        output_file = args.output_dir / f"{file_path.stem}.json"
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(response["document"], f, indent=2, ensure_ascii=False)
+        print(f"✓ {file_path.name} -> {output_file} ({response['seconds']:.2f}s)")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+import traceback
+
+# Add parent directory to Python path so we can import extractors
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from settings import COMBINED_EXTRACTION, WORKER_SOCKET_PATH
+from extractors.extraction_utils import extract_and_format_data_async
+from extractors.registry import get_extractor
+
+# Long-lived extraction worker. It builds the extractors and their HTTP
+# clients once, then serves jobs over a Unix socket, one JSON object per line:
+#   {"action": "extract", "file": "/path/2301.md"} -> {"status": "ok", "document": {...}}
+#   {"action": "ping"} / {"action": "shutdown"}
+# Jobs from different connections run concurrently on one event loop.
+# extract_client.py is the thin client.
+
+def socket_in_use(path: str) -> bool:
+    """Check whether a worker is already listening on path."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+            return True
+        except OSError:
+            return False
+
+def warm_up() -> None:
+    """Build the extractors (agents, prompts and model clients) before the first job."""
+    extractor_types = ("combined",) if COMBINED_EXTRACTION else ("patient", "burn", "medical_history")
+    for extractor_type in extractor_types:
+        get_extractor(extractor_type, project_root)
+
+async def handle_request(request: dict, stop: asyncio.Event) -> dict:
+    """Run one request and return its response."""
+    action = request.get("action")
+    if action == "ping":
+        return {"status": "ok", "pid": os.getpid()}
+    if action == "shutdown":
+        stop.set()
+        return {"status": "ok"}
+    if action == "extract":
+        start = time.perf_counter()
+        document = await extract_and_format_data_async(Path(request["file"]), project_root, show_progress=False)
+        seconds = round(time.perf_counter() - start, 3)
+        if document is None:
+            return {"status": "failed", "seconds": seconds}
+        return {"status": "ok", "document": document, "seconds": seconds}
+    return {"status": "error", "error": f"Unknown action: {action}"}
+
+async def serve(socket_path: str) -> None:
+    stop = asyncio.Event()
+
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await handle_request(json.loads(line), stop)
+                except Exception as e:
+                    print(traceback.format_exc())
+                    response = {"status": "error", "error": str(e)}
+                writer.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle_connection, path=socket_path, limit=2**24)
+    os.chmod(socket_path, 0o600)
+    print(f"Extraction worker {os.getpid()} listening on {socket_path}", flush=True)
+    async with server:
+        await stop.wait()
+    print("Extraction worker stopped", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve extraction jobs from warmed extractors over a Unix socket")
+    parser.add_argument("--socket", default=WORKER_SOCKET_PATH)
+    args = parser.parse_args()
+
+    if os.path.exists(args.socket):
+        if socket_in_use(args.socket):
+            print(f"A worker is already listening on {args.socket}")
+            sys.exit(1)
+        os.unlink(args.socket)
+
+    warm_up()
+    try:
+        asyncio.run(serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,307 @@
+import abc
+import asyncio
+import json
+from contextvars import ContextVar
 import os
+import time
 from pathlib import Path
+import openai
+from openai import AsyncOpenAI
 from pydantic_ai import Agent
+from pydantic_ai.exceptions import UnexpectedModelBehavior
+from pydantic_ai.models import cached_async_http_client
 from pydantic_ai.models.openai import OpenAIModel
-from typing import Optional, Type
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 from pydantic import BaseModel
-from settings import EXTRACTOR_MODELS, OPENROUTER_BASE_URL
+import httpx
+from settings import (CHUNK_MAX_TOKENS, CHUNKED_EXTRACTION, EXTRACTION_CACHE_ENABLED, EXTRACTOR_MODELS,
+                      GLOSSARY_MODE, LLM_REPLAY_DIR, LLM_REPLAY_MODE, OPENROUTER_BASE_URL, PRE_EXTRACTION_MODE,
+                      PRE_EXTRACTION_OPTIONAL_FIELDS, REQUIRED_FIELDS, SECTION_ROUTING, ModelProvider)
+
+from . import cache
+from .glossary import compile_glossary
+from .replay import ReplayTransport
+from .resilience import ProvidersUnavailable, run_with_fallback
+from .telemetry import record_call
+from .chunking import chunk_text
+from .routing import OUTPUT_RESERVE_TOKENS, choose_providers, count_tokens, missing_fields, routes_to_fast
+from .sections import select_sections
+
+# OpenAIModel instances (and their HTTP clients) shared by all extractors
+_models: Dict[str, OpenAIModel] = {}
+
+def get_model(model_name: str, api_key: str) -> OpenAIModel:
+    """Return the process-wide OpenAIModel for a model name."""
+    if model_name not in _models:
+        http_client = None
+        if LLM_REPLAY_MODE != "off":
+            recordings_dir = Path(LLM_REPLAY_DIR)
+            if not recordings_dir.is_absolute():
+                recordings_dir = Path(__file__).parent.parent / recordings_dir
+            http_client = httpx.AsyncClient(transport=ReplayTransport(LLM_REPLAY_MODE, recordings_dir),
+                                            timeout=600)
+        # max_retries=0: retries go through run_with_fallback, which respects the
+        # rate limits and circuit breakers (extractors/resilience.py)
+        openai_client = AsyncOpenAI(
+            base_url=OPENROUTER_BASE_URL,
+            api_key=api_key,
+            http_client=http_client or cached_async_http_client(),
+            max_retries=0,
+        )
+        _models[model_name] = OpenAIModel(model_name, openai_client=openai_client)
+    return _models[model_name]
+
+# Models that answered the queries of the extraction running in this task (see track_models)
+_answered_models: ContextVar[Optional[List[str]]] = ContextVar('answered_models', default=None)
+
+async def track_models(coro) -> Tuple[Any, List[str]]:
+    """Await coro and return its result with the models that answered its queries.
+
+    Run it in its own task (e.g. under asyncio.gather) so concurrent
+    extractions keep separate lists.
+    """
+    models: List[str] = []
+    token = _answered_models.set(models)
+    try:
+        return await coro, sorted(set(models))
+    finally:
+        _answered_models.reset(token)
+
+def note_answered(provider: ModelProvider) -> None:
+    """Record that provider answered a query of the extraction being tracked, if any."""
+    models = _answered_models.get()
+    if models is not None:
+        models.append(provider.value)
+
+def build_system_prompt(glossary: str, contexts: List[Tuple[str, str]], rules: str) -> str:
+    """Assemble a system prompt as a static prefix followed by the extractor's rules.
+
+    The glossary comes first and is byte-identical for every extractor, then
+    the (title, text) instruction contexts, then the rules. Providers that
+    cache prompt prefixes can reuse the glossary across extractors and the
+    whole system prompt across notes; the note itself is the user message.
+    With GLOSSARY_MODE "matched" the glossary is left out here and sent with
+    each note instead (see BaseExtractor.note_prompt).
+    """
+    parts = [f"PORTUGUESE MEDICAL GLOSSARY:\n{glossary.strip()}"] if GLOSSARY_MODE == "full" else []
+    parts.extend(f"{title}:\n{text.strip()}" for title, text in contexts)
+    parts.append(rules.strip())
+    return "\n\n".join(parts) + "\n"
+
+def usage_counts(usage) -> Dict[str, int]:
+    """Return a run's request and token counts (totals are kept by extractors/telemetry.py).
+
+    Cached input tokens come from the provider's prompt_tokens_details and
+    are a subset of the input tokens.
+    """
+    counts = {
+        "requests": usage.requests or 0,
+        "input_tokens": usage.request_tokens or 0,
+        "cached_input_tokens": (usage.details or {}).get("cached_tokens", 0),
+        "output_tokens": usage.response_tokens or 0,
+    }
+    return counts
+
+def overlay(values: Dict[str, Any], resolved: Dict[str, Any]) -> Dict[str, Any]:
+    """Return values with resolved on top; nested groups (dicts) are overlaid field by field."""
+    merged = dict(values)
+    for name, value in resolved.items():
+        if isinstance(value, dict) and isinstance(merged.get(name), dict):
+            merged[name] = overlay(merged[name], value)
+        else:
+            merged[name] = value
+    return merged
+
+def run_sync(coro):
+    """Run a coroutine to completion on a new event loop, for the blocking wrappers."""
+    return asyncio.run(coro)
+
+class BaseExtractor(abc.ABC):
+    # Pydantic model the agent returns; subclasses also set self.agent and self.system_prompt
+    result_type: Type[BaseModel] = BaseModel
+    # Note sections the extractor reads (names from extractors/sections.py); None means all
+    sections: Optional[Tuple[str, ...]] = None
+    # Sections to read instead when a declared one is missing from the note
+    section_fallbacks: Dict[str, Tuple[str, ...]] = {}
+    # Files in instructions/ the prompt is built from
+    instruction_files: Tuple[str, ...] = ()
+    # Merges the results of a long note's chunks (see run_agent_chunked); None: never chunk
+    merge_chunks: Optional[Callable[[List[BaseModel]], BaseModel]] = None
 
-class BaseExtractor:
     def __init__(self, project_root: Path, extractor_type: str):
         self.project_root = project_root
+        self.extractor_type = extractor_type
         
         # Get model from settings
-        model_name = EXTRACTOR_MODELS[extractor_type].value
+        self.provider = EXTRACTOR_MODELS[extractor_type]
+        model_name = self.provider.value
+        self.model_name = model_name
         
         # Initialize OpenRouter API
         openrouter_api_key = os.getenv('OPENROUTER_API_KEY')
         if not openrouter_api_key:
             raise ValueError("OPENROUTER_API_KEY environment variable not found")
             
-        self.model = OpenAIModel(
-            model_name,
-            base_url=OPENROUTER_BASE_URL,
-            api_key=openrouter_api_key,
+        self.openrouter_api_key = openrouter_api_key
+        self.model = get_model(model_name, openrouter_api_key)
+
+    def extract(self, filename: str | Path) -> Optional[BaseModel]:
+        """Blocking wrapper around extract_async()."""
+        return run_sync(self.extract_async(filename))
+
+    @abc.abstractmethod
+    async def extract_async(self, filename: str | Path) -> Optional[BaseModel]:
+        """Extract structured data from a medical report."""
+
+    def prefill(self, md_content: str) -> Dict[str, Any]:
+        """Return the fields that rules resolve without the LLM (see extractors/pre_extraction.py)."""
+        return {}
+
+    def resolve_fields(self, md_content: str, **known: Any) -> Dict[str, Any]:
+        """Return prefill() results plus known values, or nothing when pre-extraction is off."""
+        if PRE_EXTRACTION_MODE == "off":
+            return {}
+        resolved = {**self.prefill(md_content), **known}
+        if resolved:
+            names = [name for name, value in resolved.items() if not isinstance(value, dict)]
+            names += [f"{name}.{field}" for name, value in resolved.items() if isinstance(value, dict) for field in value]
+            print(f"Resolved by rules: {', '.join(sorted(names))}")
+        return resolved
+
+    async def run_agent(self, md_content: str, resolved: Optional[Dict[str, Any]] = None,
+                        check_required: bool = True, allow_fast: bool = True) -> Optional[BaseModel]:
+        """Run the agent on md_content, answering from the extraction cache when possible.
+
+        Fields in resolved override the agent's values (nested results, like the
+        combined extractor's, are given as dicts per group). The agent is still asked
+        for the full result_type: providers cache the tool schema as part of the
+        prompt prefix, which a per-note partial schema would break.
+        Simple notes go to the fast model first (unless allow_fast is False) and are
+        escalated to the configured model when its output fails validation, the
+        request fails (API error or no provider available) or it leaves
+        REQUIRED_FIELDS empty.
+        """
+        resolved = resolved or {}
+        remaining = tuple(name for name in self.result_type.model_fields if name not in resolved)
+        optional = PRE_EXTRACTION_OPTIONAL_FIELDS.get(self.extractor_type, [])
+        if resolved and (not remaining or PRE_EXTRACTION_MODE == "skip" and set(remaining) <= set(optional)):
+            print("All required fields resolved by rules, skipping the LLM call")
+            return self.result_type.model_validate(resolved)
+
+        prompt = self.note_prompt(md_content)
+        note_tokens = count_tokens(md_content)
+        prompt_tokens = count_tokens(self.system_prompt) + count_tokens(prompt)
+        providers = choose_providers(self.provider, md_content, note_tokens, prompt_tokens, allow_fast)
+        required = REQUIRED_FIELDS.get(self.extractor_type, []) if check_required else []
+
+        for attempt, provider in enumerate(providers):
+            can_escalate = attempt < len(providers) - 1
+            try:
+                data = await self.query(prompt, provider, prompt_tokens)
+            except UnexpectedModelBehavior as e:
+                if not can_escalate:
+                    raise
+                print(f"{provider.value} returned invalid output ({e}), escalating")
+                continue
+            except (openai.APIStatusError, ProvidersUnavailable) as e:
+                # e.g. a 400 or schema rejection from the fast model, which is not retried
+                if not can_escalate:
+                    raise
+                print(f"{provider.value} failed ({type(e).__name__}: {e}), escalating")
+                continue
+            if data is None:
+                return None
+
+            if resolved:
+                data = self.result_type.model_validate(overlay(data.model_dump(), resolved))
+            missing = missing_fields(data, required)
+            if missing and can_escalate:
+                print(f"{provider.value} left {', '.join(missing)} empty, escalating")
+                continue
+            return data
+
+    async def extract_chunks(self, chunks: List[str], resolved: Dict[str, Any],
+                             allow_fast: bool) -> Optional[BaseModel]:
+        """Extract the chunks concurrently and merge their results with merge_chunks."""
+        # A single chunk may lack required fields, so those are checked on the merged result
+        parts = await asyncio.gather(*(self.run_agent(chunk, resolved, check_required=False, allow_fast=allow_fast)
+                                       for chunk in chunks))
+        parts = [part for part in parts if part is not None]
+        return self.merge_chunks(parts) if parts else None
+
+    async def run_agent_chunked(self, md_content: str,
+                                resolved: Optional[Dict[str, Any]] = None) -> Optional[BaseModel]:
+        """Like run_agent(), but long notes are split into chunks extracted concurrently and merged.
+
+        Only used when the extractor sets merge_chunks, CHUNKED_EXTRACTION is set
+        and the note exceeds CHUNK_MAX_TOKENS.
+        Short chunks may be routed to the fast model; when the merged result
+        leaves REQUIRED_FIELDS empty, the chunks are extracted again with the
+        configured model.
+        """
+        if self.merge_chunks is None or not CHUNKED_EXTRACTION or count_tokens(md_content) <= CHUNK_MAX_TOKENS:
+            return await self.run_agent(md_content, resolved)
+        chunks = chunk_text(md_content, CHUNK_MAX_TOKENS)
+        if len(chunks) == 1:
+            return await self.run_agent(md_content, resolved)
+
+        print(f"Extracting {len(chunks)} chunks concurrently")
+        resolved = resolved or {}
+        data = await self.extract_chunks(chunks, resolved, allow_fast=True)
+        missing = missing_fields(data, REQUIRED_FIELDS.get(self.extractor_type, [])) if data else ["all fields"]
+        if missing and any(routes_to_fast(self.provider, chunk, count_tokens(chunk)) for chunk in chunks):
+            print(f"Merged chunks left {', '.join(missing)} empty, extracting them again with {self.provider.value}")
+            data = await self.extract_chunks(chunks, resolved, allow_fast=False)
+        return data
+
+    async def query(self, prompt: str, provider: ModelProvider, prompt_tokens: int) -> Optional[BaseModel]:
+        """Ask one provider (with its fallbacks) for result_type, going through the extraction cache."""
+        result_cache = cache.get_cache(self.project_root) if EXTRACTION_CACHE_ENABLED else None
+        if result_cache is not None:
+            schema_json = json.dumps(self.result_type.model_json_schema(), sort_keys=True)
+            key = cache.make_key(provider.value, self.system_prompt, schema_json, prompt)
+            if not cache.is_bypassed():
+                started = time.time()
+                cached = result_cache.get(key)
+                if cached is not None:
+                    print("Using cached extraction result")
+                    record_call(self.extractor_type, provider.value, started, time.time(), "cached")
+                    note_answered(provider)
+                    return self.result_type.model_validate_json(cached)
+
+        result, answered_by = await run_with_fallback(
+            self.agent, prompt, self.result_type, provider, prompt_tokens + OUTPUT_RESERVE_TOKENS,
+            lambda p: get_model(p.value, self.openrouter_api_key), self.extractor_type,
         )
+        if not result or not result.data:
+            return None
+        counts = usage_counts(result.usage())
+        print(f"Tokens: {counts['input_tokens']} input ({counts['cached_input_tokens']} cached), "
+              f"{counts['output_tokens']} output from {answered_by.value}")
+
+        if result_cache is not None:
+            # A fallback provider's answer is stored under its own model name
+            if answered_by is not provider:
+                key = cache.make_key(answered_by.value, self.system_prompt, schema_json, prompt)
+            result_cache.put(key, result.data.model_dump_json())
+        note_answered(answered_by)
+        return result.data
+
+    def note_prompt(self, md_content: str) -> str:
+        """Return the user message for md_content, led by its glossary entries in "matched" mode."""
+        if GLOSSARY_MODE != "matched":
+            return md_content
+        glossary = compile_glossary(self.pt_glossary).for_note(md_content)
+        return f"PORTUGUESE MEDICAL GLOSSARY (terms in this note):\n{glossary}\n\nMEDICAL NOTE:\n{md_content}"
+
+    def select_input(self, md_content: str) -> str:
+        """Keep only the note sections this extractor consumes."""
+        if not SECTION_ROUTING:
+            return md_content
+        selected = select_sections(md_content, self.sections, self.section_fallbacks)
+        if len(selected) < len(md_content):
+            print(f"Using sections {', '.join(self.sections)}: {len(selected)} of {len(md_content)} characters")
+        return selected
 
     def read_md_file(self, filename: str | Path) -> str | None:
         """Read content from a markdown file."""
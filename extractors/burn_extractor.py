@@ -3,11 +3,14 @@ from pathlib import Path
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 from pydantic_ai.models.openai import OpenAIModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import os
 import traceback
 
-from .base_extractor import BaseExtractor
+from .base_extractor import BaseExtractor, build_system_prompt
+from .chunking import first_value, ordered_union
+from .pre_extraction import prefill_burn
+from .sections import ADMISSION_NOTE, DEATH_CERTIFICATE, DEATH_NOTICE, DISCHARGE_NOTE
 
 class BurnDepth(str, Enum):
     FIRST_DEGREE = "1st degree"
@@ -47,7 +50,94 @@ class BurnData(BaseModel):
     consultations: List[str] = Field(default_factory=list)
     interventions: List[Intervention] = Field(default_factory=list)
     
+# Burn depths from least to most severe
+DEPTH_ORDER = list(BurnDepth)
+
+def merge_burn_locations(parts: List[BurnData]) -> List[BurnLocation]:
+    """Keep one entry per (location, laterality) with the highest degree seen."""
+    merged: Dict[tuple, BurnLocation] = {}
+    for part in parts:
+        for burn in part.burn_degree:
+            key = (burn.location.strip().lower(), (burn.laterality or '').strip().lower())
+            current = merged.get(key)
+            if current is None:
+                merged[key] = burn.model_copy()
+                continue
+            if DEPTH_ORDER.index(burn.degree) > DEPTH_ORDER.index(current.degree):
+                current.degree = burn.degree
+            if burn.is_circumferential:
+                current.is_circumferential = True
+    return list(merged.values())
+
+def merge_burn_data(parts: List[BurnData]) -> BurnData:
+    """Reconcile the BurnData extracted from the chunks of one note.
+
+    Lists are unioned, each burn location keeps its highest degree, TBSA is
+    the maximum, flags are true if any chunk saw them and single values come
+    from the first chunk (in note order) that has one.
+    """
+    tbsa_values = [part.tbsa for part in parts if part.tbsa is not None]
+    return BurnData(
+        injury_date=first_value(part.injury_date for part in parts),
+        injury_time=first_value(part.injury_time for part in parts),
+        injury_cause=first_value(part.injury_cause for part in parts),
+        injury_location=ordered_union(part.injury_location for part in parts),
+        burn_degree=merge_burn_locations(parts),
+        tbsa=max(tbsa_values) if tbsa_values else None,
+        inhalation_injury=any(part.inhalation_injury for part in parts),
+        pre_hospital_intubation=any(part.pre_hospital_intubation for part in parts),
+        pre_hospital_fluid=ordered_union((part.pre_hospital_fluid for part in parts),
+                                         key=lambda fluid: (fluid.type, fluid.volume)),
+        pre_hospital_other=first_value(part.pre_hospital_other for part in parts),
+        mechanical_ventilation=any(part.mechanical_ventilation for part in parts),
+        parkland_formula=first_value(part.parkland_formula for part in parts),
+        consultations=ordered_union(part.consultations for part in parts),
+        interventions=ordered_union((part.interventions for part in parts),
+                                    key=lambda intervention: (intervention.date, intervention.procedure)),
+    )
+
+# Extraction rules, also used by the combined extractor
+BURN_RULES = """\
+Extract burn injury information from Portuguese medical notes into structured data.
+Use the glossary to interpret medical terms, abbreviations, and expressions.
+
+Important rules:
+1. Burn Locations:
+- the item location must be a body part (e.g., "face", "arm", "leg") in english as in the instructions. Do not state the laterality in the laterality in this item.
+- the item degree must be a burn depth (e.g., "first-degree", "second-degree-superficial") as in the instructions
+- the item laterality must be "left", "right", or "bilateral" if applicable; null otherwise.
+- the item location must be unique within the list
+- the item degree must be unique within the list, use the highest degree if multiple entries for the same location
+- the item laterality must be null if not applicable
+- For arms/legs: create separate entries for left/right if bilateral
+- Circumferential burns only apply to limbs and torso
+- Use exact depth classifications from BurnDepth enum (first-degree, second-degree-superficial, etc.)
+
+2. Total Body Surface Area:
+- Extract the percentage from ASCQ or ASC value
+- Remove any ~ or % symbols and convert to float
+
+3. Burn Mechanism:
+- Use exactly one mechanism from BurnMechanism enum
+- For explosion/gas incidents, use THERMAL_FLAME
+- Include specific agent (e.g., "gas") in etiologic_agent field
+
+Return data according to the BurnData model structure. For missing information:
+- Use empty list for burn_locations if none found
+- Use 0.0 for total_body_surface_area if not specified
+- Use THERMAL_UNSPECIFIED for mechanism if unclear
+- Use None for etiologic_agent if not mentioned
+Return data according to the BurnData model structure.
+"""
+
 class BurnDataExtractor(BaseExtractor):
+    result_type = BurnData
+    # Injury details are in the admission note, interventions in the discharge note
+    sections = (ADMISSION_NOTE, DISCHARGE_NOTE)
+    section_fallbacks = {DISCHARGE_NOTE: (DEATH_NOTICE, DEATH_CERTIFICATE)}
+    instruction_files = ('burns-extraction.md', 'dicionario-PT.md')
+    merge_chunks = staticmethod(merge_burn_data)
+
     def __init__(self, project_root: Path):
         super().__init__(project_root, "burn")
         
@@ -78,49 +168,15 @@ class BurnDataExtractor(BaseExtractor):
             print("Initialized OpenRouter API client")
             
             # Initialize extraction agent
+            self.system_prompt = build_system_prompt(
+                self.pt_glossary,
+                [("BURN CLASSIFICATION", self.burn_context)],
+                BURN_RULES,
+            )
             self.agent = Agent(
                 model=self.model,
-                result_type=BurnData,
-                system_prompt=f"""
-                   Using this burn classification context and Portuguese medical glossary:
-                
-                BURN CLASSIFICATION:
-                {self.burn_context}
-                
-                PORTUGUESE MEDICAL TERMS:
-                {self.pt_glossary}
-                
-                Extract burn injury information from Portuguese medical notes into structured data.
-                Use the glossary to interpret medical terms, abbreviations, and expressions.
-                
-                Important rules:
-                1. Burn Locations:
-                - the item location must be a body part (e.g., "face", "arm", "leg") in english as in the instructions. Do not state the laterality in the laterality in this item.
-                - the item degree must be a burn depth (e.g., "first-degree", "second-degree-superficial") as in the instructions
-                - the item laterality must be "left", "right", or "bilateral" if applicable; null otherwise.
-                - the item location must be unique within the list
-                - the item degree must be unique within the list, use the highest degree if multiple entries for the same location
-                - the item laterality must be null if not applicable
-                - For arms/legs: create separate entries for left/right if bilateral
-                - Circumferential burns only apply to limbs and torso
-                - Use exact depth classifications from BurnDepth enum (first-degree, second-degree-superficial, etc.)
-                
-                2. Total Body Surface Area:
-                - Extract the percentage from ASCQ or ASC value
-                - Remove any ~ or % symbols and convert to float
-                
-                3. Burn Mechanism:
-                - Use exactly one mechanism from BurnMechanism enum
-                - For explosion/gas incidents, use THERMAL_FLAME
-                - Include specific agent (e.g., "gas") in etiologic_agent field
-                
-                Return data according to the BurnData model structure. For missing information:
-                - Use empty list for burn_locations if none found
-                - Use 0.0 for total_body_surface_area if not specified
-                - Use THERMAL_UNSPECIFIED for mechanism if unclear
-                - Use None for etiologic_agent if not mentioned
-                Return data according to the BurnData model structure.
-                """,
+                result_type=self.result_type,
+                system_prompt=self.system_prompt,
             )
             print("Initialized extraction agent with context and glossary")
             
@@ -129,7 +185,11 @@ class BurnDataExtractor(BaseExtractor):
             print(traceback.format_exc())
             raise
 
-    def extract(self, filename: str | Path) -> Optional[BurnData]:
+    def prefill(self, md_content: str) -> Dict[str, Any]:
+        """Resolve fixed-format burn fields with rules."""
+        return prefill_burn(md_content)
+
+    async def extract_async(self, filename: str | Path) -> Optional[BurnData]:
         """Extract burn data from medical report."""
         try:
             print(f"\nExtracting burn data from {filename}")
@@ -140,21 +200,17 @@ class BurnDataExtractor(BaseExtractor):
                 print("No content read from file")
                 return None
             print(f"Read {len(md_content)} characters from markdown file")
+            md_content = self.select_input(md_content)
                 
             print("Sending request to extraction agent...")
-            result = self.agent.run_sync(md_content)
-            
-            if not result:
-                print("Error: No result returned from agent")
-                return None
+            data = await self.run_agent_chunked(md_content, self.resolve_fields(md_content))
                 
-            if not result.data:
+            if not data:
                 print("Error: No data in result")
                 return None
                 
             # Validate the extracted data
             print("\nExtracted burn data:")
-            data = result.data
             print(f"TBSA: {data.tbsa}%")
             print(f"Burn locations ({len(data.burn_degree)}):")
             for burn in data.burn_degree:
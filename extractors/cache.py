@@ -0,0 +1,104 @@
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from settings import EXTRACTION_CACHE_MAX_MB, EXTRACTION_CACHE_PATH
+
+# Set EXTRACTION_CACHE_BYPASS=1 (or call set_bypass) to ignore cached results;
+# fresh results are still stored
+_bypass = os.getenv('EXTRACTION_CACHE_BYPASS') == '1'
+
+_cache: Optional["ExtractionCache"] = None
+
+def make_key(model_name: str, system_prompt: str, schema_json: str, input_text: str) -> str:
+    """Hash everything that determines an agent's answer."""
+    digest = hashlib.sha256()
+    for part in (model_name, system_prompt, schema_json, input_text):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """SQLite store of extraction results keyed by make_key().
+
+    When the stored values exceed max_bytes, the least recently used
+    entries are evicted down to 90% of the limit.
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None."""
+        row = self.conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Store value under key and evict old entries if over the size limit."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+            (key, value, len(value.encode('utf-8')), time.time()),
+        )
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries until under the size limit."""
+        total = self.stats()[1]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        rows = self.conn.execute("SELECT key, size FROM results ORDER BY accessed").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= target:
+                break
+            stale.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def stats(self) -> Tuple[int, int]:
+        """Return (number of entries, bytes stored)."""
+        count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return count, total
+
+    def clear(self) -> None:
+        """Delete every entry."""
+        self.conn.execute("DELETE FROM results")
+
+def get_cache(project_root: Path) -> ExtractionCache:
+    """Return the process-wide cache configured in settings."""
+    global _cache
+    if _cache is None:
+        path = Path(EXTRACTION_CACHE_PATH)
+        if not path.is_absolute():
+            path = project_root / path
+        _cache = ExtractionCache(path, EXTRACTION_CACHE_MAX_MB * 2**20)
+    return _cache
+
+def set_bypass(bypass: bool) -> None:
+    """Ignore (True) or use (False) cached results for the rest of the process."""
+    global _bypass
+    _bypass = bypass
+
+def is_bypassed() -> bool:
+    """Check whether cached results are being ignored."""
+    return _bypass
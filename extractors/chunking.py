@@ -0,0 +1,70 @@
+from typing import Iterable, List, Optional, TypeVar
+
+from .routing import count_tokens
+from .sections import split_sections
+
+T = TypeVar('T')
+
+def split_long_section(name: str, body: str, max_tokens: int) -> List[str]:
+    """Split one section on line boundaries into pieces of at most max_tokens.
+
+    Every piece after the first starts with the section marker again, so each
+    chunk says which note it comes from.
+    """
+    marker = f">> {name} <<" if name else ''
+    pieces: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for line in body.splitlines():
+        line_tokens = count_tokens(line)
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append('\n'.join(current))
+            current = [marker] if marker else []
+            current_tokens = count_tokens(marker)
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append('\n'.join(current))
+    return pieces
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Split merged note text into chunks of at most max_tokens (local count).
+
+    Consecutive sections are packed together while they fit; a section that
+    is longer than max_tokens on its own is split on line boundaries.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for name, body in split_sections(text).items():
+        tokens = count_tokens(body)
+        if tokens > max_tokens:
+            if current:
+                chunks.append('\n'.join(current))
+                current, current_tokens = [], 0
+            chunks.extend(split_long_section(name, body, max_tokens))
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append('\n'.join(current))
+            current, current_tokens = [], 0
+        current.append(body)
+        current_tokens += tokens
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+def ordered_union(lists: Iterable[List[T]], key=lambda item: item) -> List[T]:
+    """Concatenate lists, keeping the first occurrence of each key."""
+    seen = set()
+    merged = []
+    for items in lists:
+        for item in items:
+            item_key = key(item)
+            if item_key not in seen:
+                seen.add(item_key)
+                merged.append(item)
+    return merged
+
+def first_value(values: Iterable[Optional[T]]) -> Optional[T]:
+    """Return the first value that is not None or empty."""
+    return next((value for value in values if value not in (None, '', {})), None)
@@ -0,0 +1,130 @@
+from pathlib import Path
+from pydantic import BaseModel, Field
+from pydantic_ai import Agent
+from typing import Any, Dict, List, Optional
+import os
+import traceback
+
+from .base_extractor import BaseExtractor, build_system_prompt
+from .burn_extractor import BURN_RULES, BurnData, merge_burn_data
+from .medical_history_extractor import MEDICAL_HISTORY_RULES, MedicalHistory, merge_medical_history
+from .patient_extractor import PATIENT_RULES, PatientData, extract_patient_id, merge_patient_data
+from .pre_extraction import prefill_burn, prefill_patient
+from .sections import ADMISSION_NOTE, DEATH_CERTIFICATE, DEATH_NOTICE, DISCHARGE_NOTE
+
+COMBINED_RULES = f"""\
+Extract three groups of data from the same Portuguese medical notes and
+return them together as a CombinedData object.
+
+A. patient (PatientData):
+{PATIENT_RULES}
+B. burn (BurnData):
+{BURN_RULES}
+C. medical_history (MedicalHistory):
+{MEDICAL_HISTORY_RULES}"""
+
+class CombinedData(BaseModel):
+    """Patient, burn and medical history data extracted in one call."""
+    patient: PatientData
+    burn: BurnData
+    medical_history: MedicalHistory = Field(default_factory=MedicalHistory)
+
+def merge_combined_data(parts: List[CombinedData]) -> CombinedData:
+    """Reconcile the CombinedData extracted from the chunks of one note, group by group."""
+    return CombinedData(
+        patient=merge_patient_data([part.patient for part in parts]),
+        burn=merge_burn_data([part.burn for part in parts]),
+        medical_history=merge_medical_history([part.medical_history for part in parts]),
+    )
+
+class CombinedExtractor(BaseExtractor):
+    """Single-call alternative to the patient, burn and medical history extractors.
+
+    The note text and the glossary are sent once instead of three times.
+    Enabled with COMBINED_EXTRACTION in settings.py. Fields resolved by rules
+    override the nested patient and burn results; as the medical history
+    always needs the LLM, the call is never skipped. Long notes are chunked
+    like the burn extractor's (see BaseExtractor.run_agent_chunked).
+    """
+    result_type = CombinedData
+    # Union of the sections the three separate extractors read
+    sections = (ADMISSION_NOTE, DISCHARGE_NOTE)
+    section_fallbacks = {DISCHARGE_NOTE: (DEATH_NOTICE, DEATH_CERTIFICATE)}
+    instruction_files = ('patient-extraction.md', 'burns-extraction.md',
+                         'medical-history-extraction.md', 'dicionario-PT.md')
+    merge_chunks = staticmethod(merge_combined_data)
+
+    def __init__(self, project_root: Path):
+        super().__init__(project_root, "combined")
+
+        try:
+            # Load context files, each once
+            contexts = {}
+            for filename in self.instruction_files:
+                path = project_root / 'instructions' / filename
+                if not path.exists():
+                    raise FileNotFoundError(f"Instruction file not found: {path}")
+                contexts[filename] = path.read_text()
+            self.patient_context = contexts['patient-extraction.md']
+            self.burn_context = contexts['burns-extraction.md']
+            self.history_context = contexts['medical-history-extraction.md']
+            self.pt_glossary = contexts['dicionario-PT.md']
+
+            # connect to gemini API
+            GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+            if not GEMINI_API_KEY:
+                raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+            self.system_prompt = build_system_prompt(
+                self.pt_glossary,
+                [
+                    ("PATIENT DATA INSTRUCTIONS", self.patient_context),
+                    ("BURN CLASSIFICATION", self.burn_context),
+                    ("MEDICAL HISTORY INSTRUCTIONS", self.history_context),
+                ],
+                COMBINED_RULES,
+            )
+            self.agent = Agent(
+                model=self.model,
+                result_type=self.result_type,
+                system_prompt=self.system_prompt,
+            )
+            print("Initialized combined extraction agent with context and glossary")
+
+        except Exception:
+            print("Error initializing CombinedExtractor:")
+            print(traceback.format_exc())
+            raise
+
+    def prefill(self, md_content: str) -> Dict[str, Any]:
+        """Resolve fixed-format patient and burn fields with rules, nested as in CombinedData."""
+        groups = {"patient": prefill_patient(md_content), "burn": prefill_burn(md_content)}
+        return {group: fields for group, fields in groups.items() if fields}
+
+    async def extract_async(self, filename: str | Path) -> Optional[CombinedData]:
+        """Extract patient, burn and medical history data in a single call."""
+        try:
+            print(f"\nExtracting combined data from {filename}")
+
+            patient_id = extract_patient_id(str(filename))
+
+            md_content = self.read_md_file(filename)
+            if not md_content:
+                print("No content read from file")
+                return None
+            md_content = self.select_input(md_content)
+
+            print("Sending request to combined extraction agent...")
+            data = await self.run_agent_chunked(md_content, self.resolve_fields(md_content))
+
+            if not data:
+                print("Error: No data in result")
+                return None
+
+            data.patient.id_patient = patient_id
+            return data
+
+        except Exception:
+            print("\nError extracting combined data:")
+            print(traceback.format_exc())
+            return None
@@ -1,12 +1,18 @@
+import asyncio
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Optional, Tuple
 from datetime import datetime
+from pydantic import BaseModel
 from rich.console import Console
 from rich.progress import Progress
+from settings import COMBINED_EXTRACTION, LINEAGE_ENABLED
 
-from .patient_extractor import PatientDataExtractor, PatientData
-from .burn_extractor import BurnDataExtractor, BurnData
-from .medical_history_extractor import MedicalHistoryExtractor, MedicalHistory
+from .base_extractor import run_sync, track_models
+from .patient_extractor import PatientData
+from .burn_extractor import BurnData
+from .medical_history_extractor import MedicalHistory
+from .lineage import extractor_types, fingerprint, get_store, stale_reasons
+from .registry import EXTRACTOR_CLASSES, get_extractor
 
 def format_date(date_str: Optional[str]) -> Optional[str]:
     """Convert date string to YYYY-MM-DD format."""
@@ -108,43 +114,87 @@ def create_mongo_document(patient_data: PatientData, burn_data: BurnData, medica
     
     return doc
 
-def extract_and_format_data(filename: str | Path, project_root: Path) -> Optional[dict]:
-    """Extract data from markdown file and format it for MongoDB."""
+async def extract_all(filename: str | Path, project_root: Path,
+                      combined: bool = COMBINED_EXTRACTION, incremental: bool = False,
+                      redo: Iterable[str] = ()
+                      ) -> Tuple[Optional[PatientData], Optional[BurnData], Optional[MedicalHistory]]:
+    """Return (patient data, burn data, medical history) for a note.
+
+    Fresh results are stored with their lineage (see extractors/lineage.py).
+    With incremental, extractors whose lineage is unchanged are not run and
+    their stored results are reused; extractors in redo always run.
+    """
+    types = extractor_types(combined)
+    results: Dict[str, Optional[BaseModel]] = {}
+    lineage: Dict[str, dict] = {}
+    file_path = Path(filename) if Path(filename).is_absolute() else project_root / filename
+    if LINEAGE_ENABLED and file_path.exists():
+        md_content = file_path.read_text(encoding='utf-8')
+        lineage = {t: fingerprint(t, md_content, project_root) for t in types}
+        if incremental:
+            records = get_store(project_root).load(file_path.stem)
+            for t in types:
+                if t not in redo and not stale_reasons(records.get(t), lineage[t], t):
+                    results[t] = EXTRACTOR_CLASSES[t].result_type.model_validate(records[t]["result"])
+            if results:
+                print(f"Reusing {', '.join(results)} results, lineage unchanged")
+
+    pending = [t for t in types if t not in results]
+    fresh = await asyncio.gather(*(track_models(get_extractor(t, project_root).extract_async(filename))
+                                   for t in pending))
+    results.update((t, result) for t, (result, _) in zip(pending, fresh))
+    if lineage:
+        extracted = {t: (lineage[t], models, result) for t, (result, models) in zip(pending, fresh)
+                     if result is not None}
+        if extracted:
+            get_store(project_root).update(file_path.stem, file_path, extracted)
+
+    if combined:
+        data = results["combined"]
+        if not data:
+            return None, None, None
+        return data.patient, data.burn, data.medical_history
+    return results["patient"], results["burn"], results["medical_history"]
+
+async def extract_and_format_data_async(filename: str | Path, project_root: Path,
+                                       show_progress: bool = True, incremental: bool = False,
+                                       redo: Iterable[str] = ()) -> Optional[dict]:
+    """Extract data from markdown file and format it for MongoDB.
+
+    The patient, burn and medical history extractions run concurrently, or
+    as a single call when COMBINED_EXTRACTION is set; incremental and redo
+    are passed to extract_all().
+    Batch runners pass show_progress=False, as only one progress display
+    can be live at a time.
+    """
+    console = Console()
     try:
-        console = Console()
-        
-        with Progress(console=console) as progress:
-            # Extract patient data
-            task1 = progress.add_task("[cyan]Extracting patient data...", total=None)
-            patient_extractor = PatientDataExtractor(project_root)
-            patient_data = patient_extractor.extract(filename)
-            progress.remove_task(task1)
-            
-            if not patient_data:
-                console.print("[red]Failed to extract patient data[/red]")
-                return None
-                
-            # Extract burn data
-            task2 = progress.add_task("[magenta]Extracting burn data...", total=None)
-            burn_extractor = BurnDataExtractor(project_root)
-            burn_data = burn_extractor.extract(filename)
-            progress.remove_task(task2)
-            
-            if not burn_data:
-                console.print("[red]Failed to extract burn data[/red]")
-                return None
-                
-            # Extract medical history
-            task3 = progress.add_task("[yellow]Extracting medical history...", total=None)
-            medical_extractor = MedicalHistoryExtractor(project_root)
-            medical_history = medical_extractor.extract(filename)
-            progress.remove_task(task3)
-            
-            if not medical_history:
-                console.print("[yellow]Warning: No medical history extracted[/yellow]")
-        
+        extractions = extract_all(filename, project_root, incremental=incremental, redo=redo)
+        if show_progress:
+            with Progress(console=console) as progress:
+                task = progress.add_task("[cyan]Extracting patient, burn and medical history data...", total=None)
+                patient_data, burn_data, medical_history = await extractions
+                progress.remove_task(task)
+        else:
+            patient_data, burn_data, medical_history = await extractions
+
+        if not patient_data:
+            console.print("[red]Failed to extract patient data[/red]")
+            return None
+
+        if not burn_data:
+            console.print("[red]Failed to extract burn data[/red]")
+            return None
+
+        if not medical_history:
+            console.print("[yellow]Warning: No medical history extracted[/yellow]")
+
         return create_mongo_document(patient_data, burn_data, medical_history)
-        
+
     except Exception as e:
         console.print(f"[red]Error in data extraction: {str(e)}[/red]")
         return None
+
+def extract_and_format_data(filename: str | Path, project_root: Path) -> Optional[dict]:
+    """Blocking wrapper around extract_and_format_data_async()."""
+    return run_sync(extract_and_format_data_async(filename, project_root))
@@ -0,0 +1,150 @@
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Per-note glossary: instead of sending all of instructions/dicionario-PT.md
+# with every call, an Aho-Corasick automaton built from its terms finds the
+# ones that occur in a note and only those entries are sent along with it.
+
+ENTRY_LINE = re.compile(r'^- (.+?)\s*:\s*(.+)$')
+ALSO_VARIANTS = re.compile(r'\balso\b(.*)', re.IGNORECASE)
+QUOTED = re.compile(r'"([^"]+)"')
+OPTIONAL_GROUP = re.compile(r'\(([^()]+)\)')
+
+def fold(text: str) -> str:
+    """Strip accents so "Médico" matches "Medico"; the length of text is unchanged for NFC input."""
+    decomposed = unicodedata.normalize('NFD', text)
+    folded = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return folded if len(folded) == len(text) else text
+
+def is_word_char(ch: str) -> bool:
+    # Digits may touch a term ("D7", "10cm"); ordinal marks count as punctuation ("2ºG")
+    return ch.isalpha() and ch not in 'ºª'
+
+def expand_optional(term: str) -> List[str]:
+    """Expand "(a)" style optional suffixes: "Dr(a)" -> ["Dr(a)", "Dr", "Dra"]."""
+    variants = [term]
+    group = OPTIONAL_GROUP.search(term)
+    if group:
+        head, tail = term[:group.start()], term[group.end():]
+        for middle in ('', group.group(1)):
+            variants.extend(v for v in expand_optional(head + middle + tail) if v not in variants)
+    return variants
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every occurrence of any pattern in one pass over the text."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+        for pattern in patterns:
+            self.add(pattern)
+        self.build()
+
+    def add(self, pattern: str) -> None:
+        state = 0
+        for ch in pattern:
+            if ch not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][ch] = len(self.goto) - 1
+            state = self.goto[state][ch]
+        self.output[state].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def build(self) -> None:
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque(self.goto[0].values())  # depth-1 states fail to the root
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text: str) -> Iterable[Tuple[int, int, int]]:
+        """Yield (start, end, pattern index) for every match in text."""
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for index in self.output[state]:
+                yield i + 1 - len(self.patterns[index]), i + 1, index
+
+class Glossary:
+    """Glossary entries and the matchers for their terms.
+
+    Terms written in capitals (acronyms such as "AP" or "UMA") match case
+    sensitively, the others case insensitively; accents are ignored and a
+    term only matches where it is not part of a longer word.
+    """
+
+    def __init__(self, text: str):
+        self.preamble: List[str] = []
+        self.entries: List[str] = []
+        # Entries without a term (general reading rules) go with every note
+        self.always: Set[int] = set()
+        exact: Dict[str, Set[int]] = {}
+        folded: Dict[str, Set[int]] = {}
+        for line in text.strip().splitlines():
+            line = line.strip()
+            if not line.startswith('- '):
+                if not self.entries:
+                    self.preamble.append(line)
+                elif line:
+                    self.entries[-1] += '\n' + line  # wrapped definition
+                continue
+            index = len(self.entries)
+            self.entries.append(line)
+            entry = ENTRY_LINE.match(line)
+            if not entry:
+                self.always.add(index)
+                continue
+            for term in self.terms(entry.group(1), entry.group(2)):
+                if term.upper() == term:
+                    exact.setdefault(fold(term), set()).add(index)
+                else:
+                    folded.setdefault(fold(term).lower(), set()).add(index)
+        self.exact = (AhoCorasick(exact), list(exact.values()))
+        self.folded = (AhoCorasick(folded), list(folded.values()))
+
+    @staticmethod
+    def terms(term: str, definition: str) -> List[str]:
+        """Return a term, its optional-suffix variants and the spellings listed after "also"."""
+        terms = expand_optional(term.strip().strip('"'))
+        also = ALSO_VARIANTS.search(definition)
+        if also:
+            terms.extend(QUOTED.findall(also.group(1)))
+        return [t for t in terms if t.strip()]
+
+    def matched_entries(self, note: str) -> List[str]:
+        """Return the entries whose terms occur in note, in glossary order."""
+        text = fold(note)
+        found: Set[int] = set(self.always)
+        for (matcher, entries), haystack in ((self.exact, text), (self.folded, text.lower())):
+            for start, end, index in matcher.find(haystack):
+                pattern = matcher.patterns[index]
+                if is_word_char(pattern[0]) and start > 0 and is_word_char(haystack[start - 1]):
+                    continue
+                if is_word_char(pattern[-1]) and end < len(haystack) and is_word_char(haystack[end]):
+                    continue
+                found |= entries[index]
+        return [self.entries[i] for i in sorted(found)]
+
+    def for_note(self, note: str) -> str:
+        """Return the glossary text for note: the preamble and the matched entries."""
+        return '\n'.join(self.preamble + self.matched_entries(note))
+
+@lru_cache(maxsize=None)
+def compile_glossary(text: str) -> Glossary:
+    """Return the Glossary for a glossary file's text, built once per process."""
+    return Glossary(text)
@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+from collections import Counter
+from datetime import datetime
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+import settings
+from data.manifest import hash_file, hash_text
+from settings import COMBINED_EXTRACTION, EXTRACTOR_MODELS, FAST_MODEL, LINEAGE_DIR, MODEL_ROUTING, SECTION_ROUTING
+
+from .registry import EXTRACTOR_CLASSES, get_extractor
+from .sections import select_sections
+
+# Lineage of extraction results: for every patient, one JSON file under
+# LINEAGE_DIR with, per extractor, what its result was extracted from (hashes
+# of the note sections it reads, its instruction files and assembled system
+# prompt, the configured model, the result schema and the settings that
+# shape the request), the models that answered and the result itself. When
+# any of these changes, or a result came from an outage fallback model, only
+# the (patient, extractor) pairs affected are extracted again; the other
+# results are reused to rebuild the patient's document.
+#   python -m extractors.lineage data/md-final        # show the plan
+#   python batch_extraction.py --incremental          # carry it out
+
+LINEAGE_KEYS = ("note", "instructions", "prompt", "model", "schema", "settings")
+
+# Settings that change the request sent for a note, or which model answers it
+LINEAGE_SETTINGS = ("GLOSSARY_MODE", "PRE_EXTRACTION_MODE", "MODEL_ROUTING", "FAST_MODEL",
+                    "ROUTING_SIMPLE_MAX_TOKENS", "ROUTING_SIMPLE_MAX_DATES",
+                    "CHUNKED_EXTRACTION", "CHUNK_MAX_TOKENS")
+
+def extractor_types(combined: bool = COMBINED_EXTRACTION) -> Tuple[str, ...]:
+    """Return the extractors that produce a patient's document."""
+    return ("combined",) if combined else ("patient", "burn", "medical_history")
+
+@lru_cache(maxsize=None)
+def _hash_instruction(path: Path, mtime_ns: int, size: int) -> str:
+    return hash_file(path)
+
+def instruction_hashes(extractor_type: str, project_root: Path) -> Dict[str, Optional[str]]:
+    """Return {file name: content hash} of an extractor's instruction files, hashing each version once."""
+    hashes = {}
+    for filename in EXTRACTOR_CLASSES[extractor_type].instruction_files:
+        path = project_root / 'instructions' / filename
+        stat = path.stat() if path.exists() else None
+        hashes[filename] = _hash_instruction(path, stat.st_mtime_ns, stat.st_size) if stat else None
+    return hashes
+
+@lru_cache(maxsize=None)
+def schema_hash(result_type: type) -> str:
+    return hash_text(json.dumps(result_type.model_json_schema(), sort_keys=True))
+
+def settings_snapshot() -> Dict[str, object]:
+    """Return the current LINEAGE_SETTINGS values."""
+    values = {name: getattr(settings, name) for name in LINEAGE_SETTINGS}
+    return {name: value.value if isinstance(value, Enum) else value for name, value in values.items()}
+
+def fingerprint(extractor_type: str, md_content: str, project_root: Path) -> dict:
+    """Return the current lineage of extractor_type's result for a note."""
+    extractor_class = EXTRACTOR_CLASSES[extractor_type]
+    note = md_content
+    if SECTION_ROUTING:
+        note = select_sections(md_content, extractor_class.sections, extractor_class.section_fallbacks)
+    return {
+        "note": hash_text(note),
+        "instructions": instruction_hashes(extractor_type, project_root),
+        "prompt": hash_text(get_extractor(extractor_type, project_root).system_prompt),
+        "model": EXTRACTOR_MODELS[extractor_type].value,
+        "schema": schema_hash(extractor_class.result_type),
+        "settings": settings_snapshot(),
+    }
+
+def expected_models(extractor_type: str) -> List[str]:
+    """Return the models that answer extractor_type when no provider is failing."""
+    models = [EXTRACTOR_MODELS[extractor_type].value]
+    if MODEL_ROUTING:
+        models.append(FAST_MODEL.value)
+    return models
+
+def stale_reasons(record: Optional[dict], current: dict, extractor_type: str) -> List[str]:
+    """Return why a stored record no longer matches current ([] when it is up to date)."""
+    if not record or record.get("result") is None:
+        return ["new"]
+    reasons = [key for key in LINEAGE_KEYS if record.get(key) != current[key]]
+    if set(record.get("answered_by", [])) - set(expected_models(extractor_type)):
+        reasons.append("fallback")
+    return reasons
+
+class LineageStore:
+    """Per-patient lineage files in a directory, written atomically."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def path(self, patient: str) -> Path:
+        return self.directory / f"{patient}.json"
+
+    def load(self, patient: str) -> Dict[str, dict]:
+        """Return {extractor type: record} for a patient."""
+        path = self.path(patient)
+        if not path.exists():
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("extractors", {})
+
+    def update(self, patient: str, source: Path,
+               results: Dict[str, Tuple[dict, List[str], BaseModel]]) -> None:
+        """Store fresh results with their lineage and answering models, keeping the patient's other records."""
+        records = self.load(patient)
+        extracted_at = datetime.now().isoformat(timespec='seconds')
+        for extractor_type, (current, answered_by, result) in results.items():
+            records[extractor_type] = {**current, "answered_by": answered_by, "extracted_at": extracted_at,
+                                       "result": result.model_dump(mode='json')}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(patient)
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"file": str(source), "extractors": records}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+def get_store(project_root: Path) -> LineageStore:
+    return LineageStore(project_root / LINEAGE_DIR)
+
+def plan_file(file_path: Path, project_root: Path, store: LineageStore,
+              redo: Iterable[str] = ()) -> Dict[str, List[str]]:
+    """Return {extractor type: reasons} for the extractors a note needs re-run with."""
+    md_content = file_path.read_text(encoding='utf-8')
+    records = store.load(file_path.stem)
+    file_plan = {}
+    for extractor_type in extractor_types():
+        current = fingerprint(extractor_type, md_content, project_root)
+        reasons = stale_reasons(records.get(extractor_type), current, extractor_type)
+        if extractor_type in redo:
+            reasons = reasons or ["forced"]
+        if reasons:
+            file_plan[extractor_type] = reasons
+    return file_plan
+
+def plan(files: Iterable[Path], project_root: Path,
+         redo: Iterable[str] = ()) -> Dict[Path, Dict[str, List[str]]]:
+    """Return the minimal set of (patient, extractor) pairs to re-extract, by file."""
+    store = get_store(project_root)
+    plans = {file_path: plan_file(file_path, project_root, store, tuple(redo)) for file_path in files}
+    return {file_path: file_plan for file_path, file_plan in plans.items() if file_plan}
+
+def summary_lines(plans: Dict[Path, Dict[str, List[str]]], total_files: int) -> List[str]:
+    """Describe a plan: pairs to redo per extractor and why."""
+    pairs = sum(len(file_plan) for file_plan in plans.values())
+    lines = [f"{pairs} (patient, extractor) pairs to extract in {len(plans)} of {total_files} patients"]
+    for extractor_type in extractor_types():
+        reasons = Counter(reason for file_plan in plans.values() for reason in file_plan.get(extractor_type, []))
+        if reasons:
+            count = sum(1 for file_plan in plans.values() if extractor_type in file_plan)
+            detail = ", ".join(f"{reason} {n}" for reason, n in reasons.most_common())
+            lines.append(f"  {extractor_type}: {count} ({detail})")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Show which (patient, extractor) pairs need re-extraction")
+    parser.add_argument("inputs", nargs="*", type=Path, help="patient .md files or directories")
+    parser.add_argument("--redo", nargs="+", default=[], choices=sorted(EXTRACTOR_CLASSES),
+                        help="extractors to re-run regardless of lineage")
+    parser.add_argument("--verbose", action="store_true", help="list every pair")
+    args = parser.parse_args()
+
+    project_root = Path(__file__).parent.parent
+    files = []
+    for path in args.inputs or [project_root / "data" / "md-final"]:
+        files.extend(sorted(path.glob('*.md')) if path.is_dir() else [path])
+
+    plans = plan(files, project_root, args.redo)
+    if args.verbose:
+        for file_path, file_plan in plans.items():
+            print(f"{file_path.name}: " + "; ".join(f"{t} ({', '.join(r)})" for t, r in file_plan.items()))
+    print("\n".join(summary_lines(plans, len(files))))
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,9 @@ from pydantic_ai.models.openai import OpenAIModel
 from typing import List, Optional
 import traceback
 
-from .base_extractor import BaseExtractor
+from .base_extractor import BaseExtractor, build_system_prompt
+from .chunking import ordered_union
+from .sections import ADMISSION_NOTE
 
 class Surgery(BaseModel):
     """Surgery information."""
@@ -33,8 +35,36 @@ class MedicalHistory(BaseModel):
         description="Known allergies before admission"
     )
 
-   
+
+def merge_medical_history(parts: List[MedicalHistory]) -> MedicalHistory:
+    """Reconcile the MedicalHistory extracted from the chunks of one note by unioning its lists."""
+    return MedicalHistory(
+        diseases=ordered_union(part.diseases for part in parts),
+        medications=ordered_union(part.medications for part in parts),
+        previous_surgeries=ordered_union((part.previous_surgeries for part in parts),
+                                         key=lambda surgery: (surgery.procedure, surgery.date)),
+        allergies=ordered_union(part.allergies for part in parts),
+    )
+
+# Extraction rules, also used by the combined extractor
+MEDICAL_HISTORY_RULES = """\
+Extract patient's previous medical history from Portuguese text.
+Focus on information before the current injury:
+1. Pre-existing diseases and conditions
+2. Regular medications taken before injury
+3. Previous surgeries with dates if available
+4. Known allergies
+
+Return MedicalHistory object with all fields.
+Use empty lists for missing information.
+"""
+
 class MedicalHistoryExtractor(BaseExtractor):
+    result_type = MedicalHistory
+    # Pre-admission history is only taken from the admission note
+    sections = (ADMISSION_NOTE,)
+    instruction_files = ('medical-history-extraction.md', 'dicionario-PT.md')
+
     def __init__(self, project_root: Path):
         super().__init__(project_root, "medical_history")
         
@@ -60,25 +90,15 @@ class MedicalHistoryExtractor(BaseExtractor):
             if not GEMINI_API_KEY:
                 raise ValueError("GEMINI_API_KEY not found in environment variables")
 
+            self.system_prompt = build_system_prompt(
+                self.pt_glossary,
+                [("MEDICAL HISTORY INSTRUCTIONS", self.history_context)],
+                MEDICAL_HISTORY_RULES,
+            )
             self.agent = Agent(
                 model=self.model,
-                result_type=MedicalHistory,
-                system_prompt=f"""
-                Using these instructions and Portuguese medical glossary:
-                
-                {self.history_context}
-                {self.pt_glossary}
-                
-                Extract patient's previous medical history from Portuguese text.
-                Focus on information before the current injury:
-                1. Pre-existing diseases and conditions
-                2. Regular medications taken before injury
-                3. Previous surgeries with dates if available
-                4. Known allergies
-                
-                Return MedicalHistory object with all fields.
-                Use empty lists for missing information.
-                """
+                result_type=self.result_type,
+                system_prompt=self.system_prompt,
             )
 
         except Exception as e:
@@ -86,7 +106,7 @@ class MedicalHistoryExtractor(BaseExtractor):
             print(traceback.format_exc())
             raise
 
-    def extract(self, filename: str | Path) -> Optional[MedicalHistory]:
+    async def extract_async(self, filename: str | Path) -> Optional[MedicalHistory]:
         """Extract medical history from report."""
         try:
             print(f"\nExtracting medical history from {filename}")
@@ -94,15 +114,15 @@ class MedicalHistoryExtractor(BaseExtractor):
             md_content = self.read_md_file(filename)
             if not md_content:
                 return None
+            md_content = self.select_input(md_content)
                 
             print("Processing medical history...")
-            result = self.agent.run_sync(md_content)
+            data = await self.run_agent(md_content)
             
-            if not result or not result.data:
+            if not data:
                 return None
                 
             # Log extracted data
-            data = result.data
             print("\nExtracted medical history:")
             print(f"Diseases: {len(data.diseases)}")
             print(f"Medications: {len(data.medications)}")
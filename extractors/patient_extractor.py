@@ -3,11 +3,14 @@ from pathlib import Path
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 from pydantic_ai.models.openai import OpenAIModel
-from typing import Optional
+from typing import Any, Dict, List, Optional
 import os
 import traceback
 
-from .base_extractor import BaseExtractor
+from .base_extractor import BaseExtractor, build_system_prompt
+from .chunking import first_value
+from .pre_extraction import prefill_patient
+from .sections import ADMISSION_NOTE, DEATH_CERTIFICATE, DEATH_NOTICE, DISCHARGE_NOTE
 
 class PatientData(BaseModel):
     id_patient: int = Field(description="Patient ID from filename")
@@ -23,7 +26,42 @@ class PatientData(BaseModel):
     discharge_time: Optional[str] = Field(default=None)
     destination: Optional[str] = Field(default=None)
     
+def merge_patient_data(parts: List[PatientData]) -> PatientData:
+    """Reconcile the PatientData extracted from the chunks of one note: each field from the first chunk that has it."""
+    return PatientData(**{name: first_value(getattr(part, name) for part in parts) for name in PatientData.model_fields})
+
+def extract_patient_id(filename: str | Path) -> int:
+    """Extract numeric ID from the file name (not its directories)."""
+    try:
+        match = re.search(r'(\d+)', Path(filename).stem)
+        if not match:
+            raise ValueError(f"No numeric ID found in filename: {filename}")
+        return int(match.group(1))
+    except Exception as e:
+        print(f"Error extracting patient ID from {filename}:")
+        print(traceback.format_exc())
+        raise
+
+# Extraction rules, also used by the combined extractor
+PATIENT_RULES = """\
+Extract patient information from Portuguese medical text into structured data.
+
+Pay attention to:
+1. Dates must be in dd-mm-yyyy format
+2. Times must be in HH:MM format (24h)
+3. Address should include full street address when available
+4. For missing information, use None
+
+Return a complete PatientData object.
+"""
+
 class PatientDataExtractor(BaseExtractor):
+    result_type = PatientData
+    sections = (ADMISSION_NOTE, DISCHARGE_NOTE)
+    # Without a discharge note the discharge date is the date of death
+    section_fallbacks = {DISCHARGE_NOTE: (DEATH_NOTICE, DEATH_CERTIFICATE)}
+    instruction_files = ('patient-extraction.md', 'dicionario-PT.md')
+
     def __init__(self, project_root: Path):
         super().__init__(project_root, "patient")
         
@@ -54,25 +92,15 @@ class PatientDataExtractor(BaseExtractor):
             print("Initialized OpenRouter API client")
             
             # Initialize extraction agent
+            self.system_prompt = build_system_prompt(
+                self.pt_glossary,
+                [("PATIENT DATA INSTRUCTIONS", self.patient_context)],
+                PATIENT_RULES,
+            )
             self.agent = Agent(
                 model=self.model,
-                result_type=PatientData,
-                system_prompt=f"""
-                Using these instructions and Portuguese medical glossary:
-                
-                {self.patient_context}
-                {self.pt_glossary}
-                
-                Extract patient information from Portuguese medical text into structured data.
-                
-                Pay attention to:
-                1. Dates must be in dd-mm-yyyy format
-                2. Times must be in HH:MM format (24h)
-                3. Address should include full street address when available
-                4. For missing information, use None
-                
-                Return a complete PatientData object.
-                """,
+                result_type=self.result_type,
+                system_prompt=self.system_prompt,
             )
             print("Initialized extraction agent with context and glossary")
             
@@ -81,19 +109,15 @@ class PatientDataExtractor(BaseExtractor):
             print(traceback.format_exc())
             raise
 
-    def extract_patient_id(self, filename: str) -> int:
+    def extract_patient_id(self, filename: str | Path) -> int:
         """Extract numeric ID from filename."""
-        try:
-            match = re.search(r'(\d+)', filename)
-            if not match:
-                raise ValueError(f"No numeric ID found in filename: {filename}")
-            return int(match.group(1))
-        except Exception as e:
-            print(f"Error extracting patient ID from {filename}:")
-            print(traceback.format_exc())
-            raise
+        return extract_patient_id(filename)
+
+    def prefill(self, md_content: str) -> Dict[str, Any]:
+        """Resolve fixed-format patient fields with rules."""
+        return prefill_patient(md_content)
 
-    def extract(self, filename: str | Path) -> Optional[PatientData]:
+    async def extract_async(self, filename: str | Path) -> Optional[PatientData]:
         """Extract patient data from medical report."""
         try:
             print(f"\nExtracting patient data from {filename}")
@@ -108,25 +132,23 @@ class PatientDataExtractor(BaseExtractor):
                 print("No content read from file")
                 return None
             print(f"Read {len(md_content)} characters from markdown file")
+            md_content = self.select_input(md_content)
                 
             print("Sending request to extraction agent...")
-            result = self.agent.run_sync(md_content)
-            
-            if not result:
-                print("Error: No result returned from agent")
-                return None
+            resolved = self.resolve_fields(md_content, id_patient=patient_id)
+            data = await self.run_agent(md_content, resolved)
                 
-            if not result.data:
+            if not data:
                 print("Error: No data in result")
                 return None
                 
             # Validate the extracted data
             print("\nExtracted data:")
-            result.data.id_patient = patient_id
-            for field, value in result.data.model_dump().items():
+            data.id_patient = patient_id
+            for field, value in data.model_dump().items():
                 print(f"{field}: {value}")
                 
-            return result.data
+            return data
             
         except Exception as e:
             print(f"\nError extracting patient data:")
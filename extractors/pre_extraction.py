@@ -0,0 +1,135 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from .sections import ADMISSION_NOTE, DISCHARGE_NOTE, split_sections
+
+# Rule-based extraction of the fields the hospital templates write in a fixed
+# format. A field is only returned when the rules find exactly one value for it;
+# anything missing or contradictory is left to the LLM.
+
+# Lines at the top of a note that hold the patient identification block
+HEADER_LINES = 15
+
+DATE = re.compile(r'\b(?:(\d{4})-(\d{2})-(\d{2})|(\d{1,2})[-/.](\d{1,2})[-/.](\d{4}))\b')
+ISO_DATE = re.compile(r'\b(\d{4})-(\d{2})-(\d{2})\b')
+TIME = re.compile(r'\b([01]?\d|2[0-3])[:h]([0-5]\d)\b')
+GENDER = re.compile(r'\b(masculino|feminino)\b', re.IGNORECASE)
+PROCESS_LABEL = re.compile(r'\bN\.?\s*[ºo°]\.?\s*(?:de\s+)?processo\b\s*:?\s*(\d*)', re.IGNORECASE)
+PHONE_LABEL = re.compile(r'\bTel\s*:', re.IGNORECASE)
+NAME = re.compile(r'^(?:nome\s*:\s*)?([^\W\d_]+(?:[ \'-][^\W\d_]+)+)$', re.IGNORECASE)
+ADMISSION_LABEL = re.compile(r'(?:data\s+de\s+admiss[ãa]o(?:\s+na\s+UQ)?|admitid[oa]\s+na\s+UQ(?:\s+em)?)\s*:?\s*', re.IGNORECASE)
+DISCHARGE_LABEL = re.compile(r'(?:alta\s+m[ée]dica|data\s+de\s+alta)\s*:?\s*', re.IGNORECASE)
+TBSA = re.compile(r'\bASC[QT]?\b\s*(?::|=|de|total)?\s*(?:~|±|cerca\s+de|aprox\.?)?\s*(\d{1,3}(?:[.,]\d+)?)\s*%', re.IGNORECASE)
+
+def normalize_date(match: re.Match) -> Optional[str]:
+    """Return a DATE/ISO_DATE match as dd-mm-yyyy, or None if it is not a real date."""
+    groups = match.groups()
+    if groups[0] is not None:
+        year, month, day = groups[:3]
+    else:
+        day, month, year = groups[3:6]
+    try:
+        return datetime(int(year), int(month), int(day)).strftime('%d-%m-%Y')
+    except ValueError:
+        return None
+
+def normalize_time(match: re.Match) -> str:
+    """Return a TIME match as HH:MM."""
+    return f"{int(match.group(1)):02d}:{match.group(2)}"
+
+def unique(values: Iterable[Any]) -> Optional[Any]:
+    """Return the single distinct non-empty value, or None if there are none or several."""
+    distinct = {value for value in values if value not in (None, '')}
+    return distinct.pop() if len(distinct) == 1 else None
+
+def header_lines(text: str) -> List[str]:
+    """Return the first non-empty lines of the first note in text."""
+    sections = split_sections(text)
+    first = next((body for name, body in sections.items() if name), text)
+    lines = [line.strip() for line in first.splitlines()]
+    return [line for line in lines if line and not line.startswith('>>')][:HEADER_LINES]
+
+def labelled_date_times(text: str, label: re.Pattern) -> List[tuple]:
+    """Return the (date, time) pairs written right after each occurrence of label."""
+    pairs = []
+    for match in label.finditer(text):
+        rest = text[match.end():match.end() + 40].split('\n', 1)[0]
+        date = DATE.match(rest)
+        if not date:
+            continue
+        time = TIME.search(rest, date.end())
+        pairs.append((normalize_date(date), normalize_time(time) if time else None))
+    return pairs
+
+def find_line(lines: List[str], pattern: re.Pattern) -> Optional[int]:
+    """Return the index of the first line matching pattern."""
+    return next((i for i, line in enumerate(lines) if pattern.search(line)), None)
+
+def prefill_patient(text: str) -> Dict[str, Any]:
+    """Resolve PatientData fields from fixed-format parts of the notes."""
+    fields: Dict[str, Any] = {}
+    header = header_lines(text)
+
+    gender = unique(match.group(1)[0].upper() for match in map(GENDER.search, header) if match)
+    if gender:
+        fields['gender'] = gender
+
+    # Nº Processo: the number follows the label or sits alone on the line before it
+    process_line = find_line(header, PROCESS_LABEL)
+    number_line = None
+    if process_line is not None:
+        number = PROCESS_LABEL.search(header[process_line]).group(1)
+        number_line = process_line
+        if not number and process_line > 0 and header[process_line - 1].isdigit():
+            number_line = process_line - 1
+            number = header[number_line]
+        if number:
+            fields['process_number'] = int(number)
+
+    # Date of birth (yyyy-mm-dd) and name come before the process number
+    phone_line = find_line(header, PHONE_LABEL)
+    identification = header[:min(i for i in (number_line, phone_line, len(header)) if i is not None)]
+    birth_dates = [(i, normalize_date(m)) for i, line in enumerate(identification) for m in ISO_DATE.finditer(line)]
+    date_of_birth = unique(date for _, date in birth_dates)
+    if date_of_birth:
+        fields['date_of_birth'] = date_of_birth
+        if number_line is not None:
+            candidates = [line for line in identification[birth_dates[-1][0] + 1:] if NAME.match(line)]
+            if len(candidates) == 1:
+                fields['full_name'] = NAME.match(candidates[0]).group(1)
+
+    # Admission: an explicit label, else the first date on the line after "Tel:"
+    sections = split_sections(text)
+    admission_text = sections.get(ADMISSION_NOTE, '')
+    admissions = labelled_date_times(admission_text, ADMISSION_LABEL)
+    if not admissions and phone_line is not None and phone_line + 1 < len(header):
+        line = header[phone_line + 1]
+        date = DATE.search(line)
+        if date:
+            time = TIME.search(line, date.end())
+            admissions = [(normalize_date(date), normalize_time(time) if time else None)]
+    admission_date = unique(date for date, _ in admissions)
+    if admission_date:
+        fields['admission_date'] = admission_date
+        admission_time = unique(time for date, time in admissions if date == admission_date)
+        if admission_time:
+            fields['admission_time'] = admission_time
+
+    discharges = labelled_date_times(sections.get(DISCHARGE_NOTE, ''), DISCHARGE_LABEL)
+    discharge_date = unique(date for date, _ in discharges)
+    if discharge_date:
+        fields['discharge_date'] = discharge_date
+        discharge_time = unique(time for date, time in discharges if date == discharge_date)
+        if discharge_time:
+            fields['discharge_time'] = discharge_time
+
+    return fields
+
+def prefill_burn(text: str) -> Dict[str, Any]:
+    """Resolve BurnData fields from fixed-format parts of the notes."""
+    fields: Dict[str, Any] = {}
+    tbsa = unique(float(m.group(1).replace(',', '.')) for m in TBSA.finditer(text))
+    if tbsa is not None and 0 < tbsa <= 100:
+        fields['tbsa'] = tbsa
+    return fields
@@ -0,0 +1,47 @@
+from pathlib import Path
+from typing import Dict, Tuple, Type
+
+from .base_extractor import BaseExtractor
+from .burn_extractor import BurnDataExtractor
+from .combined_extractor import CombinedExtractor
+from .medical_history_extractor import MedicalHistoryExtractor
+from .patient_extractor import PatientDataExtractor
+
+EXTRACTOR_CLASSES: Dict[str, Type[BaseExtractor]] = {
+    "patient": PatientDataExtractor,
+    "burn": BurnDataExtractor,
+    "medical_history": MedicalHistoryExtractor,
+    "combined": CombinedExtractor,
+}
+
+# (extractor type, project root) -> (extractor, instruction file stamps at build time)
+_registry: Dict[Tuple[str, Path], Tuple[BaseExtractor, Dict[str, Tuple[int, int]]]] = {}
+
+def instruction_stamps(extractor_class: Type[BaseExtractor], project_root: Path) -> Dict[str, Tuple[int, int]]:
+    """Return {file name: (mtime_ns, size)} for an extractor's instruction files."""
+    stamps = {}
+    for filename in extractor_class.instruction_files:
+        path = project_root / 'instructions' / filename
+        stat = path.stat() if path.exists() else None
+        stamps[filename] = (stat.st_mtime_ns, stat.st_size) if stat else (0, 0)
+    return stamps
+
+def get_extractor(extractor_type: str, project_root: Path) -> BaseExtractor:
+    """Return the process-wide extractor of a type, rebuilding it if its instructions changed."""
+    extractor_class = EXTRACTOR_CLASSES[extractor_type]
+    key = (extractor_type, project_root.resolve())
+    stamps = instruction_stamps(extractor_class, project_root)
+
+    entry = _registry.get(key)
+    if entry is not None and entry[1] == stamps:
+        return entry[0]
+
+    if entry is not None:
+        print(f"Instructions for {extractor_type} extractor changed, rebuilding it")
+    extractor = extractor_class(project_root)
+    _registry[key] = (extractor, stamps)
+    return extractor
+
+def clear_registry() -> None:
+    """Drop every cached extractor."""
+    _registry.clear()
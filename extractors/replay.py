@@ -0,0 +1,76 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+# Record/replay of LLM HTTP traffic, for running the pipeline offline.
+# In "record" mode every chat completion is forwarded to the provider and the
+# response saved under LLM_REPLAY_DIR; in "replay" mode responses are served
+# from there and a request without a recording fails with HTTP 404 (which is
+# not retried). Files are keyed on the request, so changing a prompt, schema
+# or model needs a new recording.
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    """Hash a request by method, endpoint and canonical JSON body.
+
+    The endpoint is the path after the API version prefix, so recordings made
+    against OpenRouter (/api/v1/...) also match the local stand-in (/v1/...).
+    """
+    path = path.split('/v1', 1)[-1]
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True).encode('utf-8')
+    except ValueError:
+        canonical = body
+    digest = hashlib.sha256()
+    for part in (method.encode('utf-8'), path.encode('utf-8'), canonical):
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def load_recording(recordings_dir: Path, key: str) -> Optional[dict]:
+    """Return the recorded {status, body} for key, or None."""
+    path = recordings_dir / f"{key}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records responses to, or replays them from, a directory."""
+
+    def __init__(self, mode: str, recordings_dir: Path,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.mode = mode
+        self.recordings_dir = recordings_dir
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        recordings_dir.mkdir(parents=True, exist_ok=True)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        key = request_key(request.method, request.url.path, body)
+
+        if self.mode == "replay":
+            recording = load_recording(self.recordings_dir, key)
+            if recording is None:
+                return httpx.Response(404, json={"error": {"message": f"No recording for request {key}"}},
+                                      request=request)
+            return httpx.Response(recording["status"], json=recording["body"], request=request)
+
+        response = await self.transport.handle_async_request(request)
+        content = await response.aread()
+        if response.status_code == 200:
+            recording = {"status": response.status_code, "body": json.loads(content)}
+            path = self.recordings_dir / f"{key}.json"
+            tmp_path = path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(recording, indent=2), encoding='utf-8')
+            tmp_path.replace(path)
+        # content is already decoded, so drop the headers describing the wire encoding
+        headers = [(name, value) for name, value in response.headers.items()
+                   if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')]
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,185 @@
+import asyncio
+import random
+import time
+from typing import Callable, Dict, Optional, Tuple, Type
+
+import httpx
+import openai
+from pydantic import BaseModel
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import UnexpectedModelBehavior
+from pydantic_ai.models import Model
+from pydantic_ai.result import RunResult
+
+from .telemetry import record_call
+from settings import (CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS, DEFAULT_PROVIDER_LIMITS,
+                      FALLBACK_MODELS, PROVIDER_LIMITS, RETRY_ATTEMPTS, RETRY_BASE_DELAY,
+                      RETRY_MAX_DELAY, ModelProvider)
+
+# Client-side throttling, retries and provider fallback for agent runs. State
+# is per process and shared by every extractor, so concurrent extractions of a
+# batch draw from the same request and token budgets.
+
+# HTTP statuses worth retrying: timeouts, conflicts, throttling and server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class ProvidersUnavailable(Exception):
+    """Raised when every provider in the fallback chain failed or has an open circuit."""
+
+class TokenBucket:
+    """Bucket refilled continuously at per_minute units per minute.
+
+    reserve() always takes the units, letting the level go negative, and
+    returns how long the caller must wait for it to be paid back. Without
+    awaits between the check and the take, no lock is needed under asyncio.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """Take amount units and return the seconds to wait before using them."""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+class ProviderLimiter:
+    """Requests/min and tokens/min budgets of one provider."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    async def acquire(self, estimated_tokens: int) -> float:
+        """Wait until one request of estimated_tokens fits both budgets; return the seconds waited."""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            print(f"Rate limit: waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+        return wait
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token budget once the real usage is known."""
+        self.tokens.level -= actual_tokens - estimated_tokens
+
+class CircuitBreaker:
+    """Stops sending requests to a provider after repeated failures.
+
+    After threshold consecutive failures the circuit opens for reset_seconds;
+    then requests are let through again and one success closes it.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        """Check whether a request may be sent."""
+        return self.opened_at is None or time.monotonic() - self.opened_at >= self.reset_seconds
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+_limiters: Dict[ModelProvider, ProviderLimiter] = {}
+_breakers: Dict[ModelProvider, CircuitBreaker] = {}
+
+def get_limiter(provider: ModelProvider) -> ProviderLimiter:
+    """Return the process-wide limiter of a provider."""
+    if provider not in _limiters:
+        limits = PROVIDER_LIMITS.get(provider, DEFAULT_PROVIDER_LIMITS)
+        _limiters[provider] = ProviderLimiter(limits["rpm"], limits["tpm"])
+    return _limiters[provider]
+
+def set_limits(provider: ModelProvider, rpm: int, tpm: int) -> None:
+    """Replace a provider's limiter, e.g. to lift the limits against a local stand-in."""
+    _limiters[provider] = ProviderLimiter(rpm, tpm)
+
+def get_breaker(provider: ModelProvider) -> CircuitBreaker:
+    """Return the process-wide circuit breaker of a provider."""
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+    return _breakers[provider]
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether an error is transient (throttling, timeout, connection or server error)."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError,
+                          httpx.TimeoutException, httpx.TransportError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    return False
+
+def retry_delay(attempt: int, error: Exception) -> float:
+    """Return the wait before retry number attempt: Retry-After if given, else exponential backoff with full jitter."""
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+async def run_with_fallback(agent: Agent, user_prompt: str, result_type: Type[BaseModel],
+                            primary: ModelProvider, estimated_tokens: int,
+                            get_model: Callable[[ModelProvider], Model],
+                            extractor_type: str = "") -> Tuple[RunResult, ModelProvider]:
+    """Run agent on the primary provider, retrying transient errors and falling back along FALLBACK_MODELS.
+
+    Returns the run result and the provider that answered. Non-transient
+    errors are raised at once. Each provider tried is recorded in telemetry.
+    """
+    last_error: Optional[Exception] = None
+    for provider in [primary, *FALLBACK_MODELS.get(primary, [])]:
+        breaker = get_breaker(provider)
+        if not breaker.allow():
+            print(f"Circuit open for {provider.value}, skipping it")
+            continue
+        if provider is not primary:
+            print(f"Falling back to {provider.value}")
+
+        limiter = get_limiter(provider)
+        started = time.time()
+        throttled = 0.0
+        for attempt in range(RETRY_ATTEMPTS):
+            throttled += await limiter.acquire(estimated_tokens)
+            try:
+                result = await agent.run(user_prompt, result_type=result_type, model=get_model(provider))
+            except Exception as e:
+                if not is_retryable(e):
+                    outcome = "invalid_output" if isinstance(e, UnexpectedModelBehavior) else "error"
+                    record_call(extractor_type, provider.value, started, time.time(), outcome,
+                                attempt, throttled, error=repr(e))
+                    raise
+                last_error = e
+                breaker.record_failure()
+                if not breaker.allow() or attempt == RETRY_ATTEMPTS - 1:
+                    record_call(extractor_type, provider.value, started, time.time(), "failed",
+                                attempt, throttled, error=repr(e))
+                    break
+                delay = retry_delay(attempt, e)
+                print(f"{provider.value} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            breaker.record_success()
+            usage = result.usage()
+            limiter.settle(estimated_tokens, usage.total_tokens or estimated_tokens)
+            record_call(extractor_type, provider.value, started, time.time(), "ok",
+                        attempt, throttled, usage)
+            return result, provider
+
+    raise ProvidersUnavailable(f"No provider could serve the request (last error: {last_error!r})")
@@ -0,0 +1,66 @@
+from typing import Any, Iterable, List
+
+from pydantic import BaseModel
+
+from data.boilerplate import estimate_tokens
+from settings import (FAST_MODEL, MODEL_CONTEXT_WINDOWS, MODEL_ROUTING, ROUTING_SIMPLE_MAX_DATES,
+                      ROUTING_SIMPLE_MAX_TOKENS, ModelProvider)
+
+from .pre_extraction import DATE
+
+# The local count (words and punctuation) runs below real tokenizer counts on
+# Portuguese text; inflate it before comparing with a context window
+TOKEN_SAFETY_FACTOR = 1.25
+# Room left in the context window for the structured answer
+OUTPUT_RESERVE_TOKENS = 4000
+
+class InputTooLarge(ValueError):
+    """Raised when a prompt does not fit the context window of any routed model."""
+
+def count_tokens(text: str) -> int:
+    """Local token count of text, without calling a tokenizer service."""
+    return estimate_tokens(text)
+
+def is_simple(note: str, note_tokens: int) -> bool:
+    """Check whether a note is short and has few dated events."""
+    if note_tokens > ROUTING_SIMPLE_MAX_TOKENS:
+        return False
+    return len(set(match.group(0) for match in DATE.finditer(note))) <= ROUTING_SIMPLE_MAX_DATES
+
+def fits_context(provider: ModelProvider, prompt_tokens: int) -> bool:
+    """Check whether a prompt and its answer fit the provider's context window."""
+    return prompt_tokens * TOKEN_SAFETY_FACTOR + OUTPUT_RESERVE_TOKENS <= MODEL_CONTEXT_WINDOWS[provider]
+
+def routes_to_fast(configured: ModelProvider, note: str, note_tokens: int) -> bool:
+    """Check whether a note is sent to FAST_MODEL before the configured model."""
+    return MODEL_ROUTING and FAST_MODEL is not configured and is_simple(note, note_tokens)
+
+def choose_providers(configured: ModelProvider, note: str, note_tokens: int, prompt_tokens: int,
+                     allow_fast: bool = True) -> List[ModelProvider]:
+    """Return the providers to try in order: the fast model first for simple notes, then the configured one.
+
+    Providers whose context window is too small are dropped; InputTooLarge
+    is raised when none is left.
+    """
+    providers = [configured]
+    if allow_fast and routes_to_fast(configured, note, note_tokens):
+        providers.insert(0, FAST_MODEL)
+    fitting = [provider for provider in providers if fits_context(provider, prompt_tokens)]
+    if not fitting:
+        raise InputTooLarge(
+            f"Prompt of ~{prompt_tokens} tokens exceeds the context window of "
+            f"{', '.join(provider.value for provider in providers)}"
+        )
+    return fitting
+
+def missing_fields(data: BaseModel, required: Iterable[str]) -> List[str]:
+    """Return the required fields of data that are None or empty; "group.field" names a nested field."""
+    def lookup(name: str) -> Any:
+        current = data
+        for part in name.split('.'):
+            current = getattr(current, part, None)
+        return current
+
+    def empty(value: Any) -> bool:
+        return value is None or value == '' or value == []
+    return [name for name in required if empty(lookup(name))]
@@ -0,0 +1,49 @@
+import re
+from typing import Dict, Iterable, Optional
+
+# Section names as written by data/md-merge-files.py (">> name <<" ... ">> END name <<")
+ADMISSION_NOTE = 'unit admission note'
+DISCHARGE_NOTE = 'unit discharge note'
+DEATH_NOTICE = 'death notice information'
+DEATH_CERTIFICATE = 'death certificate'
+
+SECTION_START = re.compile(r'^>> (?!END )(.+?) <<$')
+SECTION_END = re.compile(r'^>> END (.+?) <<$')
+
+def split_sections(text: str) -> Dict[str, str]:
+    """Split merged note text into {section name: text}, markers included.
+
+    Text outside any section is kept under the empty name.
+    """
+    sections: Dict[str, list] = {}
+    current = ''
+    for line in text.splitlines():
+        stripped = line.strip()
+        start = SECTION_START.match(stripped)
+        if start:
+            current = start.group(1)
+        sections.setdefault(current, []).append(line)
+        if SECTION_END.match(stripped):
+            current = ''
+    return {name: '\n'.join(lines) for name, lines in sections.items()
+            if name or any(line.strip() for line in lines)}
+
+def select_sections(text: str, names: Optional[Iterable[str]],
+                    fallbacks: Optional[Dict[str, Iterable[str]]] = None) -> str:
+    """Return only the named sections of text, in document order.
+
+    A missing section is replaced by its fallbacks, if any. Without names,
+    or when the text has none of the wanted sections, the full text is returned.
+    """
+    if names is None:
+        return text
+    sections = split_sections(text)
+    wanted = set()
+    for name in names:
+        if name in sections:
+            wanted.add(name)
+        else:
+            wanted.update(n for n in (fallbacks or {}).get(name, ()) if n in sections)
+    if not wanted:
+        return text
+    return '\n'.join(section for name, section in sections.items() if name in wanted)
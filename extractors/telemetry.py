@@ -0,0 +1,214 @@
+import argparse
+import bisect
+import json
+import math
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Per-call telemetry of agent runs: one JSON line per call in TELEMETRY_PATH,
+# plus in-process histograms per (extractor, provider) that can be exported
+# as a Prometheus text file. Run this module to summarize a JSONL file:
+#   python -m extractors.telemetry [data/telemetry/calls.jsonl]
+
+from settings import MODEL_PRICES, TELEMETRY_ENABLED, TELEMETRY_PATH, TELEMETRY_PROMETHEUS_PATH
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+# Most recent observations kept for percentiles, so long-lived processes stay bounded
+PERCENTILE_WINDOW = 10000
+
+def call_cost(model: str, input_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+    """Return the USD cost of a call from MODEL_PRICES (per million tokens)."""
+    prices = MODEL_PRICES.get(model)
+    if not prices:
+        return 0.0
+    uncached = input_tokens - cached_tokens
+    return (uncached * prices["input"] + cached_tokens * prices["cached"] + output_tokens * prices["output"]) / 1e6
+
+def percentile(values: Iterable[float], q: float) -> float:
+    """Nearest-rank percentile of values (q in 0-100), 0.0 when there are none."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus exposes it.
+
+    Percentiles are taken over the last PERCENTILE_WINDOW observations.
+    """
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: deque = deque(maxlen=PERCENTILE_WINDOW)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentile(self, pct: float) -> float:
+        return percentile(self.recent, pct)
+
+class CallStats:
+    """Aggregates of the calls of one (extractor, provider) pair."""
+
+    def __init__(self):
+        self.outcomes: Dict[str, int] = {}
+        self.latency = Histogram()
+        self.retries = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+
+    def add(self, record: dict) -> None:
+        self.outcomes[record["outcome"]] = self.outcomes.get(record["outcome"], 0) + 1
+        # Cache hits would drown the model latencies
+        if record["outcome"] != "cached":
+            self.latency.observe(record["seconds"])
+        self.retries += record["retries"]
+        self.input_tokens += record["input_tokens"]
+        self.cached_tokens += record["cached_tokens"]
+        self.output_tokens += record["output_tokens"]
+        self.cost += record["cost_usd"]
+
+class Telemetry:
+    """Writes call records to a JSONL sink and keeps per-extractor/provider stats."""
+
+    def __init__(self, path: Optional[Path] = None, prometheus_path: Optional[Path] = None):
+        self.path = path
+        self.prometheus_path = prometheus_path
+        self.stats: Dict[Tuple[str, str], CallStats] = {}
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+    def add(self, record: dict) -> None:
+        """Aggregate a record without writing it."""
+        key = (record["extractor"], record["model"])
+        self.stats.setdefault(key, CallStats()).add(record)
+
+    def record(self, record: dict) -> None:
+        """Aggregate a record and write it to the sinks."""
+        self.add(record)
+        if self.path is not None:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        if self.prometheus_path is not None:
+            self.write_prometheus()
+
+    def write_prometheus(self) -> None:
+        """Write the aggregates in Prometheus text format, atomically (for node_exporter's textfile collector)."""
+        lines = [
+            "# TYPE extraction_call_duration_seconds histogram",
+            "# TYPE extraction_calls_total counter",
+            "# TYPE extraction_retries_total counter",
+            "# TYPE extraction_tokens_total counter",
+            "# TYPE extraction_cost_usd_total counter",
+        ]
+        for (extractor, model), stats in sorted(self.stats.items()):
+            labels = f'extractor="{extractor}",model="{model}"'
+            cumulative = 0
+            for bound, count in zip((*stats.latency.bounds, '+Inf'), stats.latency.counts):
+                cumulative += count
+                lines.append(f'extraction_call_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'extraction_call_duration_seconds_sum{{{labels}}} {stats.latency.sum:.3f}')
+            lines.append(f'extraction_call_duration_seconds_count{{{labels}}} {stats.latency.count}')
+            for outcome, count in sorted(stats.outcomes.items()):
+                lines.append(f'extraction_calls_total{{{labels},outcome="{outcome}"}} {count}')
+            lines.append(f'extraction_retries_total{{{labels}}} {stats.retries}')
+            for kind, count in (("input", stats.input_tokens), ("cached", stats.cached_tokens),
+                                ("output", stats.output_tokens)):
+                lines.append(f'extraction_tokens_total{{{labels},kind="{kind}"}} {count}')
+            lines.append(f'extraction_cost_usd_total{{{labels}}} {stats.cost:.6f}')
+
+        self.prometheus_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.prometheus_path.with_suffix('.tmp')
+        tmp_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        os.replace(tmp_path, self.prometheus_path)
+
+    def summary_lines(self) -> List[str]:
+        """Return one line per (extractor, provider): calls, latency percentiles, tokens and cost."""
+        lines = []
+        for (extractor, model), stats in sorted(self.stats.items()):
+            calls = sum(stats.outcomes.values())
+            outcomes = ', '.join(f"{outcome} {count}" for outcome, count in sorted(stats.outcomes.items()))
+            cached_share = stats.cached_tokens / stats.input_tokens if stats.input_tokens else 0
+            lines.append(
+                f"{extractor} / {model}: {calls} calls ({outcomes}), {stats.retries} retries, "
+                f"p50 {stats.latency.percentile(50):.1f}s p95 {stats.latency.percentile(95):.1f}s, "
+                f"{stats.input_tokens} in ({cached_share:.0%} cached) / {stats.output_tokens} out tokens, "
+                f"${stats.cost:.4f}"
+            )
+        return lines
+
+project_root = Path(__file__).parent.parent
+
+_telemetry: Optional[Telemetry] = None
+
+def get_telemetry() -> Telemetry:
+    """Return the process-wide telemetry configured in settings (paths relative to the project root)."""
+    global _telemetry
+    if _telemetry is None:
+        def resolve(path: Optional[str]) -> Optional[Path]:
+            if not path:
+                return None
+            return Path(path) if Path(path).is_absolute() else project_root / path
+        _telemetry = Telemetry(resolve(TELEMETRY_PATH), resolve(TELEMETRY_PROMETHEUS_PATH))
+    return _telemetry
+
+def record_call(extractor: str, model: str, started: float, ended: float, outcome: str,
+                retries: int = 0, throttled: float = 0.0, usage=None, error: Optional[str] = None) -> None:
+    """Record one agent call.
+
+    started/ended are time.time() values, throttled the seconds spent waiting
+    on the rate limiter and usage the run's Usage.
+    """
+    if not TELEMETRY_ENABLED:
+        return
+    input_tokens = (usage.request_tokens or 0) if usage else 0
+    cached_tokens = (usage.details or {}).get("cached_tokens", 0) if usage else 0
+    output_tokens = (usage.response_tokens or 0) if usage else 0
+    get_telemetry().record({
+        "extractor": extractor,
+        "model": model,
+        "started": started,
+        "ended": ended,
+        "seconds": round(ended - started, 3),
+        "outcome": outcome,
+        "retries": retries,
+        "throttled_seconds": round(throttled, 3),
+        "input_tokens": input_tokens,
+        "cached_tokens": cached_tokens,
+        "output_tokens": output_tokens,
+        "cost_usd": round(call_cost(model, input_tokens, cached_tokens, output_tokens), 6),
+        "error": error,
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize extraction call telemetry")
+    parser.add_argument("path", nargs="?", type=Path, default=project_root / TELEMETRY_PATH)
+    parser.add_argument("--since", type=float, default=None,
+                        help="only calls started in the last N hours")
+    args = parser.parse_args()
+
+    telemetry = Telemetry()
+    since = time.time() - args.since * 3600 if args.since else 0
+    with open(args.path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record["started"] >= since:
+                    telemetry.add(record)
+    for line in telemetry.summary_lines():
+        print(line)
+
+if __name__ == "__main__":
+    main()
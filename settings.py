@@ -1,5 +1,6 @@
+import os
 from enum import Enum
-from typing import Dict
+from typing import Dict, List
 
 class ModelProvider(Enum):
     #OPENAI = "openai/gpt-4o-mini"
@@ -12,8 +13,124 @@ class ModelProvider(Enum):
 EXTRACTOR_MODELS: Dict[str, ModelProvider] = {
     "patient": ModelProvider.OPENAI,
     "burn": ModelProvider.OPENAI,
-    "medical_history": ModelProvider.OPENAI
+    "medical_history": ModelProvider.OPENAI,
+    "combined": ModelProvider.OPENAI
 }
 
-# OpenRouter API settings
-OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
\ No newline at end of file
+# Extract patient, burn and medical history data in one call per note instead
+# of three (see extractors/combined_extractor.py and compare_extraction_modes.py)
+COMBINED_EXTRACTION = False
+
+# Try simple notes on FAST_MODEL first and escalate to the extractor's model when
+# the answer fails validation or leaves REQUIRED_FIELDS empty (see extractors/routing.py).
+# A note is simple when it has at most ROUTING_SIMPLE_MAX_TOKENS tokens (local
+# count) and ROUTING_SIMPLE_MAX_DATES distinct dates
+MODEL_ROUTING = True
+FAST_MODEL = ModelProvider.GOOGLE
+ROUTING_SIMPLE_MAX_TOKENS = 3000
+ROUTING_SIMPLE_MAX_DATES = 12
+REQUIRED_FIELDS: Dict[str, List[str]] = {
+    "patient": ["full_name", "admission_date", "discharge_date"],
+    "burn": ["tbsa", "burn_degree"],
+}
+# The combined extractor returns the same fields nested under "patient" and "burn"
+REQUIRED_FIELDS["combined"] = [f"{group}.{name}" for group in ("patient", "burn") for name in REQUIRED_FIELDS[group]]
+
+# Context window (tokens) of each model; longer prompts are refused
+MODEL_CONTEXT_WINDOWS: Dict[ModelProvider, int] = {
+    ModelProvider.OPENAI: 200_000,
+    ModelProvider.DEEPSEEK: 64_000,
+    ModelProvider.ANTHROPIC: 200_000,
+    ModelProvider.GOOGLE: 1_000_000,
+}
+
+# Client-side limits per provider (requests and tokens per minute); see extractors/resilience.py
+DEFAULT_PROVIDER_LIMITS: Dict[str, int] = {"rpm": 60, "tpm": 200_000}
+PROVIDER_LIMITS: Dict[ModelProvider, Dict[str, int]] = {
+    ModelProvider.OPENAI: {"rpm": 60, "tpm": 200_000},
+    ModelProvider.GOOGLE: {"rpm": 120, "tpm": 1_000_000},
+}
+
+# Providers tried in order when a provider keeps failing or its circuit is open
+FALLBACK_MODELS: Dict[ModelProvider, List[ModelProvider]] = {
+    ModelProvider.OPENAI: [ModelProvider.GOOGLE],
+    ModelProvider.DEEPSEEK: [ModelProvider.GOOGLE],
+    ModelProvider.ANTHROPIC: [ModelProvider.GOOGLE],
+    ModelProvider.GOOGLE: [ModelProvider.OPENAI],
+}
+
+# Retries of throttled, timed out or failed requests (exponential backoff with jitter)
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+# Consecutive failures that open a provider's circuit, and how long it stays open
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 60.0
+
+# Send each extractor only the note sections it declares (see extractors/sections.py)
+SECTION_ROUTING = True
+
+# How instructions/dicionario-PT.md reaches the model: "full" puts the whole
+# glossary at the start of every system prompt; "matched" sends with each note
+# only the entries whose terms occur in it (see extractors/glossary.py). The
+# system prompt then no longer carries the glossary, so it stays a cacheable
+# prefix, but the glossary part is no longer shared across extractors.
+GLOSSARY_MODE = "matched"
+
+# Split notes longer than CHUNK_MAX_TOKENS (local count) on section markers or
+# line boundaries, extract the chunks concurrently and merge the results
+# (burn and combined extractors; see extractors/chunking.py)
+CHUNKED_EXTRACTION = True
+CHUNK_MAX_TOKENS = 6000
+
+# Rule-based pre-extraction of fixed-format fields (see extractors/pre_extraction.py):
+# "off" ignores the rules, "fill" overrides the LLM's values with the fields the
+# rules resolved, "skip" also drops the LLM call when the only unresolved
+# fields are listed in PRE_EXTRACTION_OPTIONAL_FIELDS. The LLM is always asked
+# for the full schema, which providers cache with the prompt prefix
+PRE_EXTRACTION_MODE = "fill"
+PRE_EXTRACTION_OPTIONAL_FIELDS: Dict[str, List[str]] = {
+    "patient": ["address", "origin", "destination"],
+}
+
+# On-disk cache of extraction results (see extractors/cache.py); the path is
+# relative to the project root
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "1") == "1"
+EXTRACTION_CACHE_PATH = "data/extraction-cache.sqlite3"
+EXTRACTION_CACHE_MAX_MB = 512
+
+# Per-patient, per-extractor lineage (see extractors/lineage.py): hashes of the
+# note, instructions, system prompt and schema, the model and the request
+# settings each stored result was extracted with, so batch_extraction.py
+# --incremental re-runs only the affected extractors; the directory is
+# relative to the project root
+LINEAGE_ENABLED = os.getenv("LINEAGE_ENABLED", "1") == "1"
+LINEAGE_DIR = "data/lineage"
+
+# Per-call telemetry (see extractors/telemetry.py): a JSONL record per agent call
+# and, if a path is set, a Prometheus text file for node_exporter's textfile collector
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") == "1"
+TELEMETRY_PATH = "data/telemetry/calls.jsonl"
+TELEMETRY_PROMETHEUS_PATH = None  # e.g. "/var/lib/node_exporter/textfile/extraction.prom"
+
+# USD per million tokens, for the cost estimate in telemetry (check OpenRouter for current prices)
+MODEL_PRICES: Dict[str, Dict[str, float]] = {
+    ModelProvider.OPENAI.value: {"input": 1.10, "cached": 0.55, "output": 4.40},
+    ModelProvider.DEEPSEEK.value: {"input": 0.27, "cached": 0.07, "output": 1.10},
+    ModelProvider.ANTHROPIC.value: {"input": 0.80, "cached": 0.08, "output": 4.00},
+    ModelProvider.GOOGLE.value: {"input": 0.10, "cached": 0.025, "output": 0.40},
+}
+
+# Unix socket of the long-lived extraction worker (extraction_worker.py) and its log,
+# used by the thin client extract_client.py
+WORKER_SOCKET_PATH = os.getenv("EXTRACTION_WORKER_SOCKET", "/tmp/doentes-uq-extraction.sock")
+WORKER_LOG_PATH = "data/extraction-worker.log"
+
+# OpenRouter API settings; point OPENROUTER_BASE_URL at benchmarks/llm_standin.py to run offline
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+# Record LLM responses or replay them without network access (see extractors/replay.py):
+# "off", "record" or "replay"; the directory is relative to the project root
+LLM_REPLAY_MODE = os.getenv("LLM_REPLAY_MODE", "off")
+LLM_REPLAY_DIR = os.getenv("LLM_REPLAY_DIR", "data/llm-recordings")
\ No newline at end of file
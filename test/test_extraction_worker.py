@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from benchmarks.llm_standin import start_server
+from benchmarks.pipeline_benchmark import write_synthetic_notes
+from extract_client import is_running, send
+
+# Run with: python -m unittest discover test
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+class ExtractionWorkerTest(unittest.TestCase):
+    """Round trip through extraction_worker.py against the offline LLM stand-in."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = start_server(0, 'fixed:0')
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.socket_path = os.path.join(cls.tmp.name, "worker.sock")
+        env = {**os.environ,
+               "OPENROUTER_BASE_URL": f"http://127.0.0.1:{cls.server.server_port}/v1",
+               "OPENROUTER_API_KEY": "offline", "GEMINI_API_KEY": "offline",
+               "EXTRACTION_CACHE_ENABLED": "0", "TELEMETRY_ENABLED": "0", "LINEAGE_ENABLED": "0",
+               "LLM_REPLAY_MODE": "off"}
+        cls.worker = subprocess.Popen([sys.executable, str(PROJECT_ROOT / "extraction_worker.py"),
+                                       "--socket", cls.socket_path],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env, cwd=PROJECT_ROOT)
+        deadline = time.monotonic() + 60
+        while not is_running(cls.socket_path):
+            if cls.worker.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("extraction worker did not start")
+            time.sleep(0.1)
+
+    @classmethod
+    def tearDownClass(cls):
+        if is_running(cls.socket_path):
+            send(cls.socket_path, {"action": "shutdown"}, timeout=10)
+        cls.worker.wait(timeout=10)
+        cls.server.shutdown()
+        cls.tmp.cleanup()
+
+    def test_document_id_comes_from_the_file_name(self):
+        # Digits in the directory must not become the patient ID
+        notes_dir = Path(self.tmp.name) / "run2"
+        notes_dir.mkdir()
+        for file_path in write_synthetic_notes(notes_dir, 2):
+            response = send(self.socket_path, {"action": "extract", "file": str(file_path.resolve())}, timeout=60)
+            self.assertEqual(response["status"], "ok")
+            self.assertEqual(response["document"]["_id"], int(file_path.stem))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from pathlib import Path
+
+from extractors.glossary import AhoCorasick, Glossary
+
+# Run with: python -m unittest discover test
+
+GLOSSARY_PATH = Path(__file__).parent.parent / 'instructions' / 'dicionario-PT.md'
+
+def terms(entries):
+    """Return the term of each entry line ("- TERM : meaning")."""
+    return [entry[2:].split(':')[0].strip() for entry in entries]
+
+class AhoCorasickTest(unittest.TestCase):
+    def test_overlapping_matches(self):
+        matcher = AhoCorasick(["he", "she", "his", "hers"])
+        found = {(start, end, matcher.patterns[index]) for start, end, index in matcher.find("ushers")}
+        self.assertEqual(found, {(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")})
+
+class GlossaryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.glossary = Glossary(GLOSSARY_PATH.read_text(encoding='utf-8'))
+
+    def test_matches_terms_in_the_note(self):
+        matched = terms(self.glossary.matched_entries("HDA: queimadura por chama, ASCQ ~12%. AP: HTA."))
+        for term in ("HDA", "ASCQ", "~", "AP"):
+            self.assertIn(term, matched)
+        self.assertNotIn("VMI", matched)
+
+    def test_acronyms_are_case_sensitive(self):
+        # "uma" is the Portuguese article, "UMA" the smoking load in pack-years
+        self.assertNotIn("UMA", terms(self.glossary.matched_entries("Doente com uma queimadura.")))
+        self.assertIn("UMA", terms(self.glossary.matched_entries("Fumador, 40 UMA.")))
+
+    def test_terms_do_not_match_inside_words(self):
+        matched = terms(self.glossary.matched_entries("Acesso venoso periférico, sem complicações."))
+        self.assertNotIn("cc", matched)
+        self.assertNotIn("AP", matched)
+
+    def test_digits_and_ordinals_may_touch_a_term(self):
+        matched = terms(self.glossary.matched_entries("D7 de internamento, 2ºG na face, TOT 22cm."))
+        for term in ("D", "G", "TOT", "cm"):
+            self.assertIn(term, matched)
+
+    def test_variants_and_accents(self):
+        self.assertIn("piptaz", terms(self.glossary.matched_entries("Iniciou tazobac.")))
+        self.assertIn("EOT", terms(self.glossary.matched_entries("Submetido a IOT no local.")))
+        self.assertIn("Dr(a)", terms(self.glossary.matched_entries("Observado pela Dra. Silva.")))
+        self.assertIn("O(A) Medico(a)", terms(self.glossary.matched_entries("O Médico assistente.")))
+
+    def test_rules_without_a_term_are_always_sent(self):
+        self.assertTrue(any('"1+0+1"' in entry for entry in self.glossary.matched_entries("Sem abreviaturas.")))
+
+    def test_for_note_keeps_the_preamble_and_glossary_order(self):
+        text = self.glossary.for_note("VMI e depois VNI; HDA sem relevo.")
+        self.assertTrue(text.startswith(self.glossary.preamble[0]))
+        self.assertLess(text.index("- HDA"), text.index("- VMI"))
+        self.assertLess(text.index("- VMI"), text.index("- VNI"))
+
+if __name__ == '__main__':
+    unittest.main()
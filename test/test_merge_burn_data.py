@@ -0,0 +1,73 @@
+import unittest
+
+from extractors.burn_extractor import BurnData, BurnDepth, BurnLocation, FluidAdministration, Intervention, merge_burn_data
+
+# Run with: python -m unittest discover test
+
+def burn(location: str, degree: BurnDepth, laterality=None, circumferential=None) -> BurnLocation:
+    return BurnLocation(location=location, degree=degree, laterality=laterality, is_circumferential=circumferential)
+
+def intervention(date: str, procedure: str, details=None) -> Intervention:
+    return Intervention(date=date, procedure=procedure, details=details)
+
+class MergeBurnDataTest(unittest.TestCase):
+    def test_single_values_come_from_the_first_chunk_that_has_one(self):
+        merged = merge_burn_data([
+            BurnData(injury_cause=None, injury_date=''),
+            BurnData(injury_cause="chama", injury_date="12-03-2023", injury_time="14:00"),
+            BurnData(injury_cause="escaldão", injury_date="13-03-2023"),
+        ])
+        self.assertEqual(merged.injury_cause, "chama")
+        self.assertEqual(merged.injury_date, "12-03-2023")
+        self.assertEqual(merged.injury_time, "14:00")
+
+    def test_locations_keep_the_highest_degree(self):
+        merged = merge_burn_data([
+            BurnData(burn_degree=[burn("face", BurnDepth.SECOND_DEGREE_SUPERFICIAL),
+                                  burn("arm", BurnDepth.FIRST_DEGREE, "left")]),
+            BurnData(burn_degree=[burn("Face ", BurnDepth.THIRD_DEGREE),
+                                  burn("arm", BurnDepth.SECOND_DEGREE_DEEP, "right"),
+                                  burn("arm", BurnDepth.FIRST_DEGREE, "left", circumferential=True)]),
+        ])
+        degrees = {(b.location.strip().lower(), b.laterality): (b.degree, b.is_circumferential)
+                   for b in merged.burn_degree}
+        self.assertEqual(degrees, {
+            ("face", None): (BurnDepth.THIRD_DEGREE, None),
+            ("arm", "left"): (BurnDepth.FIRST_DEGREE, True),
+            ("arm", "right"): (BurnDepth.SECOND_DEGREE_DEEP, None),
+        })
+
+    def test_merge_does_not_modify_the_chunks(self):
+        first = BurnData(burn_degree=[burn("face", BurnDepth.FIRST_DEGREE)])
+        merge_burn_data([first, BurnData(burn_degree=[burn("face", BurnDepth.THIRD_DEGREE)])])
+        self.assertEqual(first.burn_degree[0].degree, BurnDepth.FIRST_DEGREE)
+
+    def test_tbsa_is_the_maximum_and_flags_are_ored(self):
+        merged = merge_burn_data([
+            BurnData(tbsa=12.0, inhalation_injury=True),
+            BurnData(tbsa=None, mechanical_ventilation=True),
+            BurnData(tbsa=15.5),
+        ])
+        self.assertEqual(merged.tbsa, 15.5)
+        self.assertTrue(merged.inhalation_injury)
+        self.assertTrue(merged.mechanical_ventilation)
+        self.assertFalse(merged.pre_hospital_intubation)
+        self.assertIsNone(merge_burn_data([BurnData(), BurnData()]).tbsa)
+
+    def test_lists_are_unioned_in_note_order(self):
+        merged = merge_burn_data([
+            BurnData(consultations=["ORL", "Oftalmologia"],
+                     interventions=[intervention("15-03-2023", "desbridamento")],
+                     pre_hospital_fluid=[FluidAdministration(type="LR", volume="1000 mL")]),
+            BurnData(consultations=["Oftalmologia", "Psiquiatria"],
+                     interventions=[intervention("15-03-2023", "desbridamento", "repetido no resumo"),
+                                    intervention("20-03-2023", "enxerto")],
+                     pre_hospital_fluid=[FluidAdministration(type="LR", volume="1000 mL")]),
+        ])
+        self.assertEqual(merged.consultations, ["ORL", "Oftalmologia", "Psiquiatria"])
+        self.assertEqual([(i.date, i.procedure) for i in merged.interventions],
+                         [("15-03-2023", "desbridamento"), ("20-03-2023", "enxerto")])
+        self.assertEqual(len(merged.pre_hospital_fluid), 1)
+
+if __name__ == '__main__':
+    unittest.main()
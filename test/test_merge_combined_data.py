@@ -0,0 +1,30 @@
+import unittest
+
+from extractors.burn_extractor import BurnData
+from extractors.combined_extractor import CombinedData, merge_combined_data
+from extractors.medical_history_extractor import MedicalHistory, Surgery
+from extractors.patient_extractor import PatientData
+
+# Run with: python -m unittest discover test
+
+class MergeCombinedDataTest(unittest.TestCase):
+    def test_groups_are_merged_with_their_own_rules(self):
+        merged = merge_combined_data([
+            CombinedData(patient=PatientData(id_patient=1, full_name="Maria Silva", admission_date="12-03-2023"),
+                         burn=BurnData(tbsa=12.0),
+                         medical_history=MedicalHistory(diseases=["HTA"],
+                                                        previous_surgeries=[Surgery(procedure="apendicectomia")])),
+            CombinedData(patient=PatientData(id_patient=1, full_name="", discharge_date="30-03-2023"),
+                         burn=BurnData(tbsa=15.0, consultations=["ORL"]),
+                         medical_history=MedicalHistory(diseases=["HTA", "DM tipo 2"], allergies=["penicilina"],
+                                                        previous_surgeries=[Surgery(procedure="apendicectomia")])),
+        ])
+        self.assertEqual((merged.patient.full_name, merged.patient.admission_date, merged.patient.discharge_date),
+                         ("Maria Silva", "12-03-2023", "30-03-2023"))
+        self.assertEqual((merged.burn.tbsa, merged.burn.consultations), (15.0, ["ORL"]))
+        self.assertEqual(merged.medical_history.diseases, ["HTA", "DM tipo 2"])
+        self.assertEqual(merged.medical_history.allergies, ["penicilina"])
+        self.assertEqual(len(merged.medical_history.previous_surgeries), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+from pathlib import Path
+
+from extractors.patient_extractor import extract_patient_id
+
+# Run with: python -m unittest discover test
+
+class ExtractPatientIdTest(unittest.TestCase):
+    def test_id_comes_from_the_file_name(self):
+        self.assertEqual(extract_patient_id("9000.md"), 9000)
+        self.assertEqual(extract_patient_id("data/md-final/2301_merged.md"), 2301)
+
+    def test_digits_in_directories_are_ignored(self):
+        self.assertEqual(extract_patient_id("/tmp/tmpia2pbsim/9001.md"), 9001)
+        self.assertEqual(extract_patient_id(Path("/data/run2/md-final/42.md")), 42)
+
+    def test_file_name_without_digits_is_an_error(self):
+        with self.assertRaises(ValueError):
+            extract_patient_id("/data/run2/notes.md")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import unittest
+from pathlib import Path
+
+from extractors.base_extractor import overlay
+from extractors.combined_extractor import CombinedData, CombinedExtractor
+from extractors.pre_extraction import prefill_burn, prefill_patient
+from extractors.routing import missing_fields
+
+# Run with: python -m unittest discover test
+
+# Admission note header as written by the hospital template: date of birth,
+# name, process number on the line before its label, then "Tel:" followed by
+# the admission date and time
+HEADER_NOTE = """
+>> unit admission note <<
+Unidade de Queimados
+1965-05-14
+Maria José da Silva
+1234567
+Nº Processo:
+Feminino
+Rua das Flores 12, 4000-123 Porto
+Tel: 912345678
+12-03-2023 14:35
+HDA: Admitida na UQ em 12-03-2023 14:35 proveniente do SU.
+Queimadura por chama, ASCQ ~12%, 2ºG profundo na face.
+>> END unit admission note <<
+
+>> unit discharge note <<
+Alta médica: 30/03/2023 10h05
+ASCQ 12 %
+>> END unit discharge note <<
+"""
+
+# Same layout with an empty "Tel:" line and the admission date under its own label
+LABELLED_NOTE = """
+>> unit admission note <<
+Unidade de Queimados
+1980-01-02
+João Pedro Santos
+7654321
+Nº Processo:
+Masculino
+Rua Central 5, 4200-001 Porto
+Tel:
+Data de admissão na UQ: 05-06-2022 08:10
+>> END unit admission note <<
+"""
+
+class PrefillPatientTest(unittest.TestCase):
+    def test_header_layout(self):
+        self.assertEqual(prefill_patient(HEADER_NOTE), {
+            'gender': 'F',
+            'process_number': 1234567,
+            'date_of_birth': '14-05-1965',
+            'full_name': 'Maria José da Silva',
+            'admission_date': '12-03-2023',
+            'admission_time': '14:35',
+            'discharge_date': '30-03-2023',
+            'discharge_time': '10:05',
+        })
+
+    def test_labelled_admission_without_discharge_note(self):
+        fields = prefill_patient(LABELLED_NOTE)
+        self.assertEqual(fields['admission_date'], '05-06-2022')
+        self.assertEqual(fields['admission_time'], '08:10')
+        self.assertEqual(fields['full_name'], 'João Pedro Santos')
+        self.assertNotIn('discharge_date', fields)
+
+    def test_process_number_after_label(self):
+        note = HEADER_NOTE.replace("1234567\nNº Processo:", "Nº Processo: 1234567")
+        self.assertEqual(prefill_patient(note)['process_number'], 1234567)
+
+    def test_conflicting_values_are_left_to_the_llm(self):
+        note = HEADER_NOTE.replace("Feminino", "Feminino\nMasculino")
+        self.assertNotIn('gender', prefill_patient(note))
+        note = HEADER_NOTE.replace("Alta médica: 30/03/2023 10h05", "Alta médica: 30/03/2023 10h05\nData de alta: 31-03-2023")
+        self.assertNotIn('discharge_date', prefill_patient(note))
+
+    def test_unstructured_note_resolves_nothing(self):
+        self.assertEqual(prefill_patient("Doente observado no SU, sem dados de identificação."), {})
+
+class PrefillBurnTest(unittest.TestCase):
+    def test_tbsa_repeated_in_admission_and_discharge(self):
+        self.assertEqual(prefill_burn(HEADER_NOTE), {'tbsa': 12.0})
+
+    def test_tbsa_formats(self):
+        self.assertEqual(prefill_burn("ASCQ: ~7,5%"), {'tbsa': 7.5})
+        self.assertEqual(prefill_burn("ASC = 40 %"), {'tbsa': 40.0})
+        self.assertEqual(prefill_burn("ASCT de 18%"), {'tbsa': 18.0})
+
+    def test_conflicting_or_invalid_tbsa_is_left_to_the_llm(self):
+        self.assertEqual(prefill_burn("ASCQ 30%; reavaliação ASCQ 35%"), {})
+        self.assertEqual(prefill_burn("ASCQ 150%"), {})
+        self.assertEqual(prefill_burn("Queimadura da mão, sem ASCQ descrita."), {})
+
+class CombinedPrefillTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("OPENROUTER_API_KEY", "offline")
+        os.environ.setdefault("GEMINI_API_KEY", "offline")
+        cls.extractor = CombinedExtractor(Path(__file__).parent.parent)
+
+    def test_fields_are_nested_by_group(self):
+        resolved = self.extractor.prefill(HEADER_NOTE)
+        self.assertEqual(resolved["patient"], prefill_patient(HEADER_NOTE))
+        self.assertEqual(resolved["burn"], {'tbsa': 12.0})
+        self.assertNotIn("burn", self.extractor.prefill(LABELLED_NOTE))
+
+    def test_overlay_keeps_the_llm_values_of_unresolved_fields(self):
+        llm = CombinedData.model_validate({
+            "patient": {"id_patient": 1, "full_name": "Maria Silva", "address": "Porto", "gender": "M"},
+            "burn": {"tbsa": 10.0, "injury_cause": "chama"},
+            "medical_history": {"diseases": ["HTA"]},
+        })
+        data = CombinedData.model_validate(overlay(llm.model_dump(), self.extractor.prefill(HEADER_NOTE)))
+        self.assertEqual(data.patient.full_name, 'Maria José da Silva')
+        self.assertEqual(data.patient.gender, 'F')
+        self.assertEqual(data.patient.address, 'Porto')
+        self.assertEqual((data.burn.tbsa, data.burn.injury_cause), (12.0, "chama"))
+        self.assertEqual(data.medical_history.diseases, ["HTA"])
+
+    def test_required_fields_can_be_nested(self):
+        data = CombinedData.model_validate({"patient": {"id_patient": 1, "full_name": "Maria"}, "burn": {}})
+        self.assertEqual(missing_fields(data, ["patient.full_name", "patient.admission_date", "burn.tbsa"]),
+                         ["patient.admission_date", "burn.tbsa"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from extractors.telemetry import Histogram, percentile
+
+# Run with: python -m unittest discover test
+
+class PercentileTest(unittest.TestCase):
+    def test_nearest_rank(self):
+        self.assertEqual(percentile([4, 1, 3, 2], 50), 2)
+        self.assertEqual(percentile([1, 2], 50), 1)
+        self.assertEqual(percentile(range(1, 21), 95), 19)
+        self.assertEqual(percentile(range(1, 101), 95), 95)
+        self.assertEqual(percentile([1, 2, 3], 100), 3)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_low_quantiles_and_empty(self):
+        self.assertEqual(percentile([1, 2, 3], 0), 1)
+        self.assertEqual(percentile([], 50), 0.0)
+
+class HistogramTest(unittest.TestCase):
+    def test_counts_all_observations_and_keeps_a_bounded_window(self):
+        histogram = Histogram(bounds=(1, 10))
+        for value in (0.5, 5, 50):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 1, 1])
+        self.assertEqual((histogram.count, histogram.sum), (3, 55.5))
+        self.assertEqual(histogram.percentile(50), 5)
+        self.assertIsNotNone(histogram.recent.maxlen)
+
+if __name__ == '__main__':
+    unittest.main()